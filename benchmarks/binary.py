@@ -0,0 +1,56 @@
+"""Binary cookbook files against JSON: load time and file size.
+
+    python benchmarks/binary.py [ingredients] [recipes] [places]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_cookbook
+from kytchen import amounts
+from kytchen.cookbook import Cookbook
+
+def load_time(path, repeat = 3):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        cookbook = Cookbook.load(path)
+        elapsed = time.perf_counter() - start
+        del cookbook
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    recipes = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    places = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    cookbook = make_cookbook(ingredients, recipes)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"json": os.path.join(tmp, "cookbook.js"),
+                 "binary": os.path.join(tmp, "cookbook.kyb")}
+        for path in paths.values():
+            cookbook.save(path)
+        del cookbook
+        print(f"{ingredients} ingredients, {recipes} recipes")
+        print(f"{'format':<8}{'MiB':>8}{'decimal s':>12}{'fixed s':>10}")
+        results = {}
+        for name, path in paths.items():
+            amounts.use_decimal()
+            decimal = load_time(path)
+            amounts.use_fixed_point(places)
+            fixed = load_time(path)
+            amounts.use_decimal()
+            size = os.path.getsize(path) / 2**20
+            results[name] = (size, decimal, fixed)
+            print(f"{name:<8}{size:>8.1f}{decimal:>12.2f}{fixed:>10.2f}")
+        json_size, json_decimal, json_fixed = results["json"]
+        size, decimal, fixed = results["binary"]
+        print(f"binary is {size / json_size:.0%} of the size, loads "
+              f"x{json_decimal / decimal:.2f} faster (decimal), "
+              f"x{json_fixed / fixed:.2f} faster (fixed)")
+
+if __name__ == "__main__":
+    main()
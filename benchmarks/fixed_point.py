@@ -0,0 +1,55 @@
+"""Decimal amounts against fixed-point integer amounts.
+
+    python benchmarks/fixed_point.py [mealplans] [days] [places]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_cookbook
+from kytchen import amounts
+from kytchen.cookbook import Cookbook
+
+def run(path):
+    cookbook = Cookbook.load(path)
+    start = time.perf_counter()
+    for recipe in cookbook.recipes:
+        recipe._invalidate()
+    for recipe in cookbook.recipes:
+        recipe.get_calories()
+    recipes = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for plan in cookbook.mealplans:
+        plan._invalidate()
+        plan._get_shopping()
+    shopping = time.perf_counter() - start
+
+    start = time.perf_counter()
+    totals = [plan.get_calories() for plan in cookbook.mealplans]
+    plans = time.perf_counter() - start
+    return recipes, shopping, plans, totals
+
+def main():
+    mealplans = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    places = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    cookbook = make_cookbook(mealplans = mealplans, days = days)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cookbook.js")
+        cookbook.save(path)
+        amounts.use_decimal()
+        decimal = run(path)
+        amounts.use_fixed_point(places)
+        fixed = run(path)
+        amounts.use_decimal()
+    print(f"{mealplans} meal plans of {days} days, {places} decimal places")
+    labels = ("recipe calories", "shopping lists", "plan calories")
+    for label, d, f in zip(labels, decimal, fixed):
+        print(f"{label:16} decimal {d * 1000:8.1f} ms"
+              f"   fixed {f * 1000:8.1f} ms   x{d / f:.2f}")
+    print("same plan calories:", decimal[3] == fixed[3])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Start-up cost of the model layer against the full GUI.
+
+Each case runs in a fresh interpreter, so that nothing is cached between
+imports. Run it from the root of the repository:
+
+    python benchmarks/import_time.py [repetitions]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = [
+    ("python only", "pass"),
+    ("import kytchen", "import kytchen"),
+    ("kytchen + Cookbook", "from kytchen import Cookbook; Cookbook()"),
+    ("kytchen + GUI", "import kytchen; kytchen.RecipeDashTable"),
+]
+
+REPORT = """
+import resource, sys
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'PyQt6' in sys.modules)
+"""
+
+def run(code):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code + "\n" + REPORT],
+                         capture_output = True, text = True, check = True)
+    elapsed = time.perf_counter() - start
+    rss, qt = out.stdout.split()
+    return elapsed, int(rss), qt == "True"
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{'case':<22}{'median ms':>10}{'min ms':>10}{'max RSS kB':>12}  Qt loaded")
+    for name, code in CASES:
+        times = []
+        rss = 0
+        for _ in range(repetitions):
+            elapsed, peak, qt = run(code)
+            times.append(elapsed * 1000)
+            rss = max(rss, peak)
+        print(f"{name:<22}{statistics.median(times):>10.1f}{min(times):>10.1f}"
+              f"{rss:>12}  {'yes' if qt else 'no'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Streaming cookbook loader against parsing the whole file first.
+
+    python benchmarks/load.py [ingredients] [recipes]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import make_cookbook
+from kytchen.cookbook import Cookbook
+
+def whole_file(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return Cookbook.from_data(data, path)
+
+def streaming(path):
+    return Cookbook.load(path)
+
+def measure(function, path):
+    gc.collect()
+    start = time.perf_counter()
+    cookbook = function(path)
+    elapsed = time.perf_counter() - start
+    del cookbook
+    gc.collect()
+    tracemalloc.start()
+    cookbook = function(path)
+    final, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cookbook
+    return elapsed, final, peak
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    recipes = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    cookbook = make_cookbook(ingredients, recipes)
+    fd, path = tempfile.mkstemp(suffix = ".js")
+    os.close(fd)
+    try:
+        cookbook.save(path)
+        del cookbook
+        size = os.path.getsize(path) / 2**20
+        print(f"{ingredients} ingredients, {recipes} recipes, {size:.1f} MiB")
+        print(f"{'loader':<12}{'time s':>10}{'final MiB':>12}{'peak MiB':>12}")
+        for name, function in [("json.load", whole_file), ("streaming", streaming)]:
+            elapsed, final, peak = measure(function, path)
+            print(f"{name:<12}{elapsed:>10.2f}{final / 2**20:>12.1f}{peak / 2**20:>12.1f}")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Memory-mapped read-only cookbooks against loading a private copy.
+
+    python benchmarks/mapped.py [ingredients] [recipes] [workers]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from synthetic import make_cookbook
+from kytchen.cookbook import Cookbook
+from kytchen.mapped import MappedCookbook, write_mapped
+
+def open_loaded(path):
+    return Cookbook.load(path)
+
+def open_mapped(path):
+    return MappedCookbook(path)
+
+def render(cookbook):
+    # What a worker does for a request: a few recipes and a shopping list.
+    for i in range(0, len(cookbook.recipes), max(len(cookbook.recipes) // 200, 1)):
+        recipe = cookbook.recipes[i]
+        recipe.get_calories(2)
+        recipe.get_ingredients(2)
+    for plan in cookbook.mealplans:
+        plan.get_shopping_list()
+
+def worker(args):
+    # Times of a worker that opens the cookbook and serves one request, then
+    # its heap when doing the same again under tracemalloc.
+    function, path = args
+    start = time.perf_counter()
+    cookbook = function(path)
+    opened = time.perf_counter() - start
+    start = time.perf_counter()
+    render(cookbook)
+    rendered = time.perf_counter() - start
+    del cookbook
+    gc.collect()
+    tracemalloc.start()
+    cookbook = function(path)
+    render(cookbook)
+    final, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return opened, rendered, final, peak
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    recipes = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    cookbook = make_cookbook(ingredients, recipes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cookbook.kyb")
+        write_mapped(cookbook, path)
+        del cookbook
+        size = os.path.getsize(path) / 2**20
+        print(f"{ingredients} ingredients, {recipes} recipes, {size:.1f} MiB file, "
+              f"{workers} workers")
+        print(f"{'cookbook':<10}{'open s':>8}{'render s':>10}"
+              f"{'heap MiB':>10}{'peak MiB':>10}{'all heaps':>11}")
+        with ProcessPoolExecutor(workers) as pool:
+            for name, function in [("loaded", open_loaded), ("mapped", open_mapped)]:
+                results = list(pool.map(worker, [(function, path)] * workers))
+                opened, rendered, final, peak = results[0]
+                total = sum(result[2] for result in results)
+                print(f"{name:<10}{opened:>8.2f}{rendered:>10.2f}{final / 2**20:>10.1f}"
+                      f"{peak / 2**20:>10.1f}{total / 2**20:>11.1f}")
+
+if __name__ == "__main__":
+    main()
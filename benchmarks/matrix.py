@@ -0,0 +1,43 @@
+"""Sparse nutrition matrix against one recipe walk per recipe.
+
+    python benchmarks/matrix.py [ingredients] [recipes]
+"""
+import sys
+import time
+from decimal import Decimal
+
+from synthetic import make_cookbook
+
+def walk(cookbook):
+    return [recipe.get_calories() for recipe in cookbook.recipes]
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    recipes = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    cookbook = make_cookbook(ingredients, recipes)
+    print(f"{ingredients} ingredients, {recipes} recipes")
+
+    exact, walked = timed(lambda: walk(cookbook))
+    matrix, built = timed(cookbook.nutrition_matrix)
+    print(f"first evaluation  walks {walked * 1000:8.1f} ms"
+          f"   matrix {built * 1000:8.1f} ms")
+
+    # Every ingredient changes, so every recipe has to be evaluated again.
+    for ing in cookbook.ingredients:
+        ing.calories = ing.calories + Decimal(1)
+    exact, walked = timed(lambda: walk(cookbook))
+    _, updated = timed(matrix.update_calories)
+    print(f"after kcal edits  walks {walked * 1000:8.1f} ms"
+          f"   matrix {updated * 1000:8.1f} ms")
+
+    error = max(abs(float(e) - m) / max(float(e), 1)
+                for e, m in zip(exact, matrix.calories))
+    print(f"largest relative difference {error:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Resident size of ingredients and recipe amount rows.
+
+    python benchmarks/memory.py [count]
+"""
+import sys
+import tracemalloc
+from decimal import Decimal
+
+from synthetic import make_cookbook
+from kytchen.cookbook import Cookbook
+from kytchen.ingredient import Ingredient
+from kytchen.recipe import Recipe
+
+def allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, kept
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Shared values, so that only the containers are measured.
+    calories = Decimal("1.5")
+    ids = [f"ing{i}" for i in range(count)]
+
+    def ingredients():
+        return [Ingredient(id_name, "", calories, "") for id_name in ids]
+    size, kept = allocated(ingredients)
+    print(f"ingredient:           {size / count:8.1f} bytes")
+
+    cookbook = Cookbook()
+    cookbook.register_ingredient(kept[0])
+    recipe = Recipe("rec", cookbook)
+    amount = Decimal("100")
+    def rows():
+        for _ in range(count):
+            recipe.amounts.append((kept[0], amount))
+        return recipe
+    size, _ = allocated(rows)
+    print(f"amount row:           {size / count:8.1f} bytes")
+
+    def list_rows():
+        return [[kept[0], amount] for _ in range(count)]
+    size, _ = allocated(list_rows)
+    print(f"amount row as a list: {size / count:8.1f} bytes")
+
+    size, cookbook = allocated(lambda: make_cookbook(count // 10, count // 40))
+    rows = sum(len(rec.amounts) for rec in cookbook.recipes)
+    rows += sum(len(day) for plan in cookbook.mealplans for day in plan._days)
+    print(f"synthetic cookbook:   {size / 2**20:8.1f} MiB "
+          f"({len(cookbook.ingredients)} ingredients, {rows} amount rows)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Exporting every recipe and meal plan as text, serially and over a process
+pool.
+
+    python benchmarks/render.py [ingredients] [recipes] [mealplans] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_cookbook
+from kytchen.render import export_documents
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    recipes = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    mealplans = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+    cookbook = make_cookbook(ingredients, recipes, mealplans)
+    print(f"{ingredients} ingredients, {recipes} recipes, {mealplans} meal plans")
+    print(f"{'workers':<10}{'s':>8}{'docs/s':>10}")
+    serial = None
+    for count in sorted({1, workers}):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            paths = export_documents(cookbook, tmp, workers = count)
+            elapsed = time.perf_counter() - start
+        serial = elapsed if serial == None else serial
+        print(f"{count:<10}{elapsed:>8.2f}{len(paths) / elapsed:>10.0f}")
+    if workers > 1:
+        print(f"x{serial / elapsed:.2f} faster with {workers} workers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Trigram search index against scanning every entry.
+
+    python benchmarks/search.py [ingredients]
+"""
+import sys
+import time
+
+from synthetic import make_cookbook
+from kytchen.search import search_text
+
+def main():
+    ingredients = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    cookbook = make_cookbook(ingredients, 1000, mealplans = 0)
+    start = time.perf_counter()
+    index = cookbook.search_index()
+    built = time.perf_counter() - start
+    print(f"{ingredients} ingredients, index built in {built:.2f} s")
+    texts = [search_text(ing) for ing in cookbook.ingredients]
+    # Type one query a key at a time, like in the search box, so that its
+    # trigrams are already looked up. The last query has not been typed.
+    query = "ingredient 1234"
+    for typed in range(1, len(query) + 1):
+        index.search(query[:typed])
+    for query in ("1", "12", "123", "ingredient 1234", "nothing"):
+        start = time.perf_counter()
+        found = index.search(query)
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        sum(1 for text in texts if query in text)
+        scan = time.perf_counter() - start
+        print(f"{query!r:18} {len(found):7} hits   index {indexed * 1000:7.2f} ms"
+              f"   scan {scan * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
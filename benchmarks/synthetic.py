@@ -0,0 +1,47 @@
+"""Synthetic cookbooks for the benchmarks."""
+import random
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kytchen.cookbook import Cookbook
+from kytchen.ingredient import Ingredient
+from kytchen.recipe import Recipe, Step
+from kytchen.mealplan import Mealplan
+
+def make_cookbook(ingredients = 2000, recipes = 500, mealplans = 10,
+                  days = 30, seed = 0):
+    rand = random.Random(seed)
+    cookbook = Cookbook()
+    for i in range(ingredients):
+        kcal = Decimal(rand.randrange(0, 9000)) / 1000
+        cookbook.register_ingredient(
+            Ingredient(f"ing{i}", f"Ingredient {i}", kcal, "g"))
+    for i in range(recipes):
+        steps = [Step(f"Step {j}", rand.randrange(30, 900))
+                 for j in range(rand.randrange(1, 8))]
+        recipe = Recipe(f"rec{i}", cookbook, f"Recipe {i}",
+                        f"Category {i % 12}", steps)
+        cookbook.register_recipe(recipe)
+    # Recipes only use recipes with a lower index, so there are no cycles,
+    # but they are saved in reverse to exercise forward references.
+    for i, recipe in enumerate(cookbook.recipes):
+        for _ in range(rand.randrange(2, 12)):
+            recipe.new_component(f"ing{rand.randrange(ingredients)}",
+                                 Decimal(rand.randrange(1, 5000)) / 10)
+        for _ in range(rand.randrange(0, 3) if i > 0 else 0):
+            recipe.new_component(f"rec{rand.randrange(i)}",
+                                 Decimal(rand.randrange(1, 40)) / 10)
+    cookbook.recipes.reverse()
+    for i in range(mealplans):
+        plan = Mealplan(cookbook, f"Plan {i}")
+        cookbook.register_mealplan(plan)
+        for day in range(days):
+            plan.new_day()
+            for _ in range(rand.randrange(2, 6)):
+                plan._new_component(plan._days[day],
+                                    f"rec{rand.randrange(recipes)}",
+                                    Decimal(rand.randrange(1, 30)) / 10)
+    return cookbook
@@ -0,0 +1,45 @@
+"""Sorting the recipe dashboard by calories.
+
+    python benchmarks/table_sort.py [recipes]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from synthetic import make_cookbook
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+from kytchen.recipe_views import RecipeDashModel, RecipeDashTable
+
+class CountingModel(RecipeDashModel):
+    calls = 0
+
+    def get_data(self, row, col):
+        CountingModel.calls += 1
+        return super().get_data(row, col)
+
+class CountingTable(RecipeDashTable):
+    ModelClass = CountingModel
+
+def main():
+    recipes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    cookbook = make_cookbook(ingredients = 2000, recipes = recipes,
+                             mealplans = 0)
+    table = CountingTable(cookbook)
+    # The model loads rows a page at a time; a click on a header fetches
+    # the rest before sorting, and so does this.
+    table.model.fetch_all()
+    print(f"{recipes} recipes, {table.model.rowCount()} rows loaded")
+    for order in (Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder):
+        CountingModel.calls = 0
+        start = time.perf_counter()
+        table.table.sortByColumn(3, order)
+        elapsed = time.perf_counter() - start
+        print(f"sort by kcal  {elapsed * 1000:8.1f} ms"
+              f"   {CountingModel.calls} cell computations")
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    main()
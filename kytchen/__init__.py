@@ -1,6 +1,40 @@
+import importlib
+
 from kytchen.ingredient import *
 from kytchen.recipe import *
 from kytchen.mealplan import *
+from kytchen.cookbook import Cookbook
 
 __version__ = "1.0.0-alpha2"
 
+# The GUI lives in its own modules so that the model layer can be used
+# without PyQt6. These names are only imported the first time they are used.
+_gui_names = {
+    "IngredientModel": "ingredient_views",
+    "IngredientTable": "ingredient_views",
+    "RecipeDashModel": "recipe_views",
+    "RecipeDashTable": "recipe_views",
+    "RecipeView": "recipe_views",
+    "StepsTableModel": "recipe_views",
+    "StepsTable": "recipe_views",
+    "AmountsTableModel": "recipe_views",
+    "AmountsTable": "recipe_views",
+    "MealplanDashModel": "mealplan_views",
+    "MealplanDashTable": "mealplan_views",
+    "MealplanView": "mealplan_views",
+    "MealplanDayModel": "mealplan_views",
+    "MealplanDayTable": "mealplan_views",
+    "ShoppingListModel": "mealplan_views",
+    "ShoppingListTable": "mealplan_views",
+}
+
+def __getattr__(name):
+    if name in _gui_names:
+        module = importlib.import_module(f"kytchen.{_gui_names[name]}")
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'kytchen' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(list(globals()) + list(_gui_names))
@@ -0,0 +1,172 @@
+from collections.abc import MutableSequence
+from decimal import Decimal
+
+# Quantities (amounts and calories) are Decimals by default. In fixed-point
+# mode they are ints counting units of 10**-places instead, which makes the
+# sums behind calories and shopping lists much cheaper. The mode has to be
+# chosen before any cookbook is loaded.
+_places = None
+_scale = None
+_half = None
+
+def use_fixed_point(places = 6):
+    global _places, _scale, _half
+    _places = places
+    _scale = 10 ** places
+    _half = _scale // 2
+
+def use_decimal():
+    global _places, _scale, _half
+    _places = _scale = _half = None
+
+def fixed_point():
+    return _places
+
+def parse(value):
+    value = Decimal(value)
+    if _scale == None:
+        return value
+    scaled = value.scaleb(_places)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"{value} has more than {_places} decimal places")
+    return int(scaled)
+
+def num(value):
+    value = parse(value)
+    if value < 0:
+        raise ValueError("expected non-negative amount")
+    return value
+
+def one():
+    if _scale == None:
+        return Decimal(1)
+    return _scale
+
+def rescale(value):
+    # Turns a product (or a sum of products) of two quantities back into a
+    # quantity. Rounds half away from zero, so that adding and removing the
+    # same amount cancels out exactly.
+    if _scale == None:
+        return value
+    if value >= 0:
+        return (value + _half) // _scale
+    return -((_half - value) // _scale)
+
+def mul(a, b):
+    return rescale(a * b)
+
+def times(value, factor):
+    # A quantity times a plain number, such as a number of servings.
+    if _scale == None or isinstance(factor, int):
+        return value * factor
+    return int((value * Decimal(factor)).to_integral_value())
+
+def to_decimal(value):
+    if _scale == None or not isinstance(value, int):
+        return value
+    return Decimal(value).scaleb(-_places)
+
+def to_str(value):
+    if _scale == None or not isinstance(value, int):
+        return str(value)
+    whole, frac = divmod(abs(value), _scale)
+    text = str(whole)
+    if frac:
+        text += "." + str(frac).rjust(_places, "0").rstrip("0")
+    if value < 0:
+        text = "-" + text
+    return text
+
+def total_to_str(total):
+    # A sum of products, such as a shopping list amount, scaled back. Its
+    # digits do not depend on how it was added up: Decimals lose the
+    # trailing zeros that the order of the sums leaves.
+    value = rescale(total)
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return to_str(value)
+
+class AmountRow():
+    # One row of an Amounts container. It unpacks and indexes like the
+    # [component, amount] lists that rows used to be, and writes go through
+    # to the container. Reads return the values the row had when it was
+    # taken, so swapping two rows with a tuple assignment works.
+    __slots__ = ("_amounts", "_index", "_component", "_amount")
+
+    def __init__(self, amounts, index, component, amount):
+        self._amounts = amounts
+        self._index = index
+        self._component = component
+        self._amount = amount
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self._component
+        yield self._amount
+
+    def __getitem__(self, i):
+        if i == 0 or i == -2:
+            return self._component
+        elif i == 1 or i == -1:
+            return self._amount
+        raise IndexError("amount row index out of range")
+
+    def __setitem__(self, i, value):
+        if i == 0 or i == -2:
+            self._component = value
+            self._amounts._components[self._index] = value
+        elif i == 1 or i == -1:
+            self._amount = value
+            self._amounts._values[self._index] = value
+        else:
+            raise IndexError("amount row index out of range")
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr([self._component, self._amount])
+
+class Amounts(MutableSequence):
+    # A list of (component, amount) rows kept as two flat lists, which
+    # takes a fraction of the memory of one small list per row.
+    __slots__ = ("_components", "_values")
+
+    def __init__(self, rows = ()):
+        self._components = []
+        self._values = []
+        for component, amount in rows:
+            self._components.append(component)
+            self._values.append(amount)
+
+    def __len__(self):
+        return len(self._components)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self._components)
+        return AmountRow(self, index, self._components[index], self._values[index])
+
+    def __setitem__(self, index, row):
+        component, amount = row
+        self._components[index] = component
+        self._values[index] = amount
+
+    def __delitem__(self, index):
+        del self._components[index]
+        del self._values[index]
+
+    def insert(self, index, row):
+        component, amount = row
+        self._components.insert(index, component)
+        self._values.insert(index, amount)
+
+    def __iter__(self):
+        return zip(self._components, self._values)
+
+    def __repr__(self):
+        return repr([list(row) for row in self])
@@ -1,17 +1,19 @@
 import sys, os
-from pathlib import Path
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QLabel,
     QPushButton, QStackedWidget, QListWidget, QFileDialog,
 )
-from PyQt6.QtCore import Qt, QSettings
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtCore import Qt, QSettings, QThread, QTimer, pyqtSignal
 
 from .cookbook import Cookbook
-from .ingredient import IngredientTable
-from .recipe import RecipeDashTable
-from .mealplan import MealplanDashTable
+from .sqlite import SqliteCookbook
+from .autosave import Autosaver
+from .binary import is_binary
+from .ingredient_views import IngredientTable
+from .recipe_views import RecipeDashTable
+from .mealplan_views import MealplanDashTable
+from .amounts import use_fixed_point
 from .views import Title, Subtitle, show_error, general_margin, ClickLabel
 from . import __version__
 
@@ -30,11 +32,46 @@ def select_file(parent, save):
         dialogue = QFileDialog.getOpenFileName
         msg = "Open a cookbook"
     
-    file_path, ok = dialogue(parent, msg, "", "Cookbooks (*.js)")
-    if ok and save and not file_path.endswith(".js"):
+    if save:
+        filters = "Cookbooks (*.js);;Binary cookbooks (*.kyb)"
+    else:
+        filters = "Cookbooks (*.js *.kyb *.db)"
+    file_path, ok = dialogue(parent, msg, "", filters)
+    if ok and save and not (file_path.endswith(".js") or is_binary(file_path)):
         file_path = file_path + ".js"
     return file_path, ok
 
+class CookbookLoader(QThread):
+    # Parses and links a cookbook file off the GUI thread.
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent, path, journal):
+        super().__init__(parent)
+        self.path = path
+        self.journal = journal
+        self.percent = -1
+
+    def report(self, fraction):
+        if self.isInterruptionRequested():
+            raise InterruptedError("loading cancelled")
+        percent = int(fraction * 100)
+        if percent != self.percent:
+            self.percent = percent
+            self.progress.emit(percent)
+
+    def run(self):
+        try:
+            cookbook = Cookbook.load(self.path, journal = self.journal,
+                                     progress = self.report)
+        except InterruptedError:
+            return
+        except Exception:
+            self.failed.emit(self.path)
+            return
+        self.loaded.emit(cookbook)
+
 def safe_save(cookbook, please = False):
     if cookbook.is_empty() and not please:
         return
@@ -187,19 +224,70 @@ class MainWindow(QMainWindow):
 
         sidebar_container.setStyleSheet(SIDEBAR_STYLE)
 
+        # The window shows up with the cookbook it was given, and the last
+        # file replaces it once it has been loaded.
+        self.loader = None
+        # Changes are saved this many seconds after the first one, all at
+        # once. Plain cookbook files are written on a worker thread.
+        self.autosaver = None
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(
+            1000 * settings.value("autosave_seconds", 5, type = int))
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.set_cookbook(cookbook)
         last_file = settings.value("last_file", None)
         if last_file != None:
+            self.load_file(last_file, quiet = True)
+
+    def load_file(self, path, quiet = False):
+        self.stop_loading()
+        if path.endswith(".db"):
+            # SQLite connections belong to the thread that opened them, and
+            # opening one does not read the cookbook anyway.
             try:
-                cookbook = Cookbook.load(last_file)
+                self.set_cookbook(SqliteCookbook.open(path))
             except:
-                pass
+                if not quiet:
+                    show_error(self, f"Could not load {path}.")
+            return
+        # Journaled cookbooks only write what changed on every save. The
+        # journal sits on top of a JSON file.
+        journal = settings.value("journal", False, type = bool) and not is_binary(path)
+        loader = CookbookLoader(self, path, journal)
+        name = os.path.basename(path)
+        loader.progress.connect(lambda percent:
+            self.statusBar().showMessage(f"Loading {name}... {percent}%"))
+        loader.loaded.connect(lambda cookbook: self.finish_loading(loader, cookbook))
+        if not quiet:
+            loader.failed.connect(lambda path: show_error(self, f"Could not load {path}."))
+        loader.finished.connect(self.statusBar().clearMessage)
+        self.loader = loader
+        loader.start()
+
+    def finish_loading(self, loader, cookbook):
+        if loader != self.loader:
+            # Another file was opened in the meantime.
+            cookbook.close()
+            return
+        self.loader = None
         self.set_cookbook(cookbook)
 
+    def stop_loading(self):
+        if self.loader != None:
+            self.loader.requestInterruption()
+            self.loader.wait()
+            self.loader = None
+
     def menu_action(self, index):
         self.stack.setCurrentIndex(index)
 
     def set_cookbook(self, cookbook):
         if self.cookbook != None:
+            if self.cookbook != cookbook:
+                self.stop_autosave()
+                self.cookbook.watchers.remove(self.schedule_autosave)
+                self.cookbook.close()
             while self.stack.count() > 0:
                 widget = self.stack.widget(0)
                 self.stack.removeWidget(widget)
@@ -215,31 +303,65 @@ class MainWindow(QMainWindow):
         for view in self.views:
             self.stack.addWidget(view)
         self.cookbook.window = self
+        if self.schedule_autosave not in cookbook.watchers:
+            cookbook.watchers.append(self.schedule_autosave)
         self.sidebar.setCurrentRow(0)
 
+    def schedule_autosave(self, obj):
+        if self.cookbook.path == None or self.autosave_timer.interval() <= 0:
+            return
+        if not self.autosave_timer.isActive():
+            self.autosave_timer.start()
+
+    def autosave(self):
+        cookbook = self.cookbook
+        if cookbook.path == None:
+            return
+        if cookbook.journal != None or isinstance(cookbook, SqliteCookbook):
+            # Both only write what changed, and SQLite has to stay on this
+            # thread.
+            cookbook.save()
+            return
+        if self.autosaver != None and self.autosaver.path != cookbook.path:
+            self.stop_autosave()
+        if self.autosaver == None:
+            self.autosaver = Autosaver(cookbook.path)
+        elif self.autosaver.error != None:
+            self.statusBar().showMessage(f"Could not save: {self.autosaver.error}")
+        self.autosaver.submit(cookbook.snapshot())
+
+    def stop_autosave(self):
+        # Waits for the last snapshot to be written, so that nothing older
+        # can overwrite a later save.
+        self.autosave_timer.stop()
+        if self.autosaver != None:
+            self.autosaver.close()
+            self.autosaver = None
+
     def save_update(self):
+        self.stop_autosave()
         safe_save(self.cookbook, please = True)
         self.set_cookbook(self.cookbook)
 
     def new_cookbook(self):
+        self.stop_autosave()
         safe_save(self.cookbook)
         self.set_cookbook(Cookbook())
     
     def open_cookbook(self):
+        self.stop_autosave()
         safe_save(self.cookbook)
         path, ok = select_file(self, False)
         if not ok:
             return False
-        try:
-            new_cookbook = Cookbook.load(path)
-        except:
-            show_error(self, f"Could not load {path}.")
-            return False
-        self.set_cookbook(new_cookbook)
+        self.load_file(path)
         return True
 
     def closeEvent(self, event):
+        self.stop_loading()
+        self.stop_autosave()
         safe_save(self.cookbook)
+        self.cookbook.close()
         event.accept()
 
     def show_about(self):
@@ -247,6 +369,10 @@ class MainWindow(QMainWindow):
 
 def main():
     app = QApplication(sys.argv)
+    # Amounts with at most this many decimal places are kept as integers.
+    places = settings.value("fixed_point_places", 0, type = int)
+    if places > 0:
+        use_fixed_point(places)
     #app.setWindowIcon(QIcon(ICON_PATH))
     cb = Cookbook()
     window = MainWindow(cb)
@@ -0,0 +1,43 @@
+import threading
+
+from .cookbook import write_data
+
+class Autosaver():
+    # Writes cookbook snapshots (see Cookbook.snapshot) to a file on a worker
+    # thread. Only the newest snapshot that is waiting is kept, so a burst
+    # of edits ends up as a single write.
+    def __init__(self, path):
+        self.path = path
+        self.error = None
+        self._pending = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+
+    def submit(self, data):
+        with self._condition:
+            self._pending = data
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending == None and not self._closed:
+                    self._condition.wait()
+                data = self._pending
+                self._pending = None
+                if data == None:
+                    return
+            try:
+                write_data(self.path, data)
+                self.error = None
+            except OSError as error:
+                self.error = error
+
+    def close(self):
+        # Writes whatever is still waiting before returning.
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
@@ -0,0 +1,356 @@
+import struct
+from decimal import Decimal
+
+from .amounts import Amounts, fixed_point
+from .ingredient import Ingredient
+from .recipe import Recipe, Step
+from .mealplan import Mealplan
+
+# Binary cookbook files (.kyb). They hold the same data as the JSON format,
+# but every string is stored once in a table and referenced by number, and
+# amounts and calories are fixed-point ints with a scale that is chosen per
+# file, so that every value survives exactly.
+#
+# All integers are little endian. The file starts with a 16 byte header
+# (magic, version, number of sections), followed by the sections. Every
+# section has a 16 byte header (tag, unused, payload length) and its payload
+# is padded to a multiple of 8 bytes, so a reader can skip the ones it does
+# not need and every record stays aligned:
+#
+#   STRS  u64 count, u64 offsets[count + 1] into the UTF-8 text that follows
+#   META  u32 decimal places of every number, u32 unused, u64 journal seq
+#   INGR  u64 count, then count records of
+#         u32 id, u32 name, u32 unit, u32 unused, i64 calories
+#   RECP  u64 count, u64 offsets[count] from the start of the payload, then
+#         u32 id, u32 name, u32 category, u32 steps, u32 amounts, u32 unused,
+#         steps times (u32 description, u32 unused, i64 seconds) and
+#         amounts times (u32 component, u32 unused, i64 amount)
+#   PLAN  u64 count, u64 offsets[count], then
+#         u32 name, u32 days, u32 entries[days] padded to 8 bytes, and the
+#         entries of every day as (u32 component, u32 unused, i64 amount)
+#   FLAT  u64 count, u64 offsets[count], then for every recipe
+#         u32 entries, u32 stored, and entries times
+#         (u32 ingredient, i32 exponent, i64 coefficient)
+#   IDX   u64 count, u32 components[count] sorted by id
+#
+# Components are numbered with the ingredients first, then the recipes, in
+# file order. Strings are numbered by their position in STRS.
+#
+# FLAT holds the ingredients per serving of every recipe with all of its
+# sub-recipes expanded, each one exactly as coefficient * 10**exponent. A
+# recipe whose values do not fit is written with stored = 0 and has to be
+# expanded by the reader. FLAT is only written on request, since it can be
+# much larger than the recipes themselves; it and IDX are only used by
+# MappedCookbook.
+
+SUFFIX = ".kyb"
+MAGIC = b"KYTCHEN\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<4sIQ")
+COUNT = struct.Struct("<Q")
+META = struct.Struct("<IIQ")
+INGREDIENT = struct.Struct("<IIIIq")
+RECIPE = struct.Struct("<IIIIII")
+PLAN = struct.Struct("<II")
+ENTRY = struct.Struct("<IIq")
+SHARE = struct.Struct("<Iiq")
+
+_LIMIT = 2 ** 63
+
+def is_binary(path):
+    return path != None and path.endswith(SUFFIX)
+
+def _pad(length):
+    return -length % 8
+
+def _places(values):
+    # Smallest number of decimal places that holds every value exactly.
+    places = 0
+    for value in values:
+        if value.as_tuple().exponent < -places and value != value.to_integral_value():
+            places = max(places, -value.normalize().as_tuple().exponent)
+    return places
+
+class _Strings():
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, text):
+        number = self.index.get(text)
+        if number == None:
+            number = self.index[text] = len(self.index)
+        return number
+
+    def payload(self):
+        encoded = [text.encode("utf-8") for text in self.index]
+        offsets = [0]
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        return (COUNT.pack(len(encoded))
+                + struct.pack(f"<{len(offsets)}Q", *offsets)
+                + b"".join(encoded))
+
+def _scaled(value, places):
+    scaled = int(value.scaleb(places))
+    if not -_LIMIT <= scaled < _LIMIT:
+        raise ValueError(f"{value} is too large for a binary cookbook")
+    return scaled
+
+def _records(payload_parts):
+    # Variable length records behind a table of their offsets.
+    count = len(payload_parts)
+    start = COUNT.size + 8 * count
+    offsets = []
+    for part in payload_parts:
+        offsets.append(start)
+        start += len(part)
+    return (COUNT.pack(count) + struct.pack(f"<{count}Q", *offsets)
+            + b"".join(payload_parts))
+
+def _share(ingredient, value):
+    exponent = value.normalize().as_tuple().exponent
+    coefficient = int(value.scaleb(-exponent))
+    if not -_LIMIT <= coefficient < _LIMIT or not -2**31 <= exponent < 2**31:
+        return None
+    return SHARE.pack(ingredient, exponent, coefficient)
+
+def _flatten(data, refs):
+    # Exact ingredients per serving of every recipe, by component number.
+    first = len(data["ingredients"])
+    uses = [[(refs[id_name], Decimal(amount))
+             for id_name, amount in rec["amounts"]] for rec in data["recipes"]]
+    flats = [None] * len(uses)
+    for start in range(len(uses)):
+        stack = [start]
+        while stack:
+            k = stack[-1]
+            if flats[k] != None:
+                stack.pop()
+                continue
+            waiting = [c - first for c, _ in uses[k]
+                       if c >= first and flats[c - first] == None]
+            if waiting:
+                if len(stack) > len(uses):
+                    raise ValueError("recipes use each other")
+                stack.extend(waiting)
+                continue
+            total = {}
+            for c, amount in uses[k]:
+                if c < first:
+                    total[c] = total.get(c, 0) + amount
+                    continue
+                for ing, share in flats[c - first].items():
+                    total[ing] = total.get(ing, 0) + amount * share
+            flats[k] = total
+            stack.pop()
+    return flats
+
+def dump(data, f, flat = False):
+    # Writes export data (see Cookbook.export) to a binary file object.
+    strings = _Strings()
+    # Duplicate ids are skipped when loading, so they resolve to the first.
+    refs = {}
+    for i, ing in enumerate(data["ingredients"]):
+        refs.setdefault(ing["id"], i)
+    for i, rec in enumerate(data["recipes"], len(data["ingredients"])):
+        refs.setdefault(rec["id"], i)
+    def ref(id_name):
+        if id_name not in refs:
+            raise ValueError(f"invalid component ID '{id_name}'")
+        return refs[id_name]
+
+    numbers = []
+    for ing in data["ingredients"]:
+        numbers.append(Decimal(ing["calories"]))
+    for rec in data["recipes"]:
+        numbers.extend(Decimal(amount) for _, amount in rec["amounts"])
+    for plan in data["mealplans"]:
+        for day in plan["days"]:
+            numbers.extend(Decimal(amount) for _, amount in day)
+    places = _places(numbers)
+    numbers = iter(numbers)
+
+    ingredients = COUNT.pack(len(data["ingredients"])) + b"".join(
+        INGREDIENT.pack(strings(ing["id"]), strings(ing["name"]),
+                        strings(ing["unit"]), 0, _scaled(next(numbers), places))
+        for ing in data["ingredients"])
+
+    recipes = []
+    for rec in data["recipes"]:
+        parts = [RECIPE.pack(strings(rec["id"]), strings(rec["name"]),
+                             strings(rec["category"]), len(rec["steps"]),
+                             len(rec["amounts"]), 0)]
+        for description, seconds in rec["steps"]:
+            if not -_LIMIT <= seconds < _LIMIT or seconds != int(seconds):
+                raise ValueError(f"invalid step time {seconds}")
+            parts.append(ENTRY.pack(strings(description), 0, int(seconds)))
+        for id_name, _ in rec["amounts"]:
+            parts.append(ENTRY.pack(ref(id_name), 0, _scaled(next(numbers), places)))
+        recipes.append(b"".join(parts))
+
+    plans = []
+    for plan in data["mealplans"]:
+        days = plan["days"]
+        parts = [PLAN.pack(strings(plan["name"]), len(days)),
+                 struct.pack(f"<{len(days)}I", *(len(day) for day in days)),
+                 bytes(_pad(4 * len(days)))]
+        for day in days:
+            for id_name, _ in day:
+                parts.append(ENTRY.pack(ref(id_name), 0, _scaled(next(numbers), places)))
+        plans.append(b"".join(parts))
+
+    ids = struct.pack(f"<{len(refs)}I", *(refs[id_name] for id_name in sorted(refs)))
+    sections = [(b"STRS", strings.payload()),
+                (b"META", META.pack(places, 0, data.get("seq", 0))),
+                (b"INGR", ingredients),
+                (b"RECP", _records(recipes)),
+                (b"PLAN", _records(plans)),
+                (b"IDX ", COUNT.pack(len(refs)) + ids)]
+    if flat:
+        flats = []
+        for vector in _flatten(data, refs):
+            entries = [_share(ing, share) for ing, share in sorted(vector.items())]
+            if None in entries:
+                flats.append(struct.pack("<II", 0, 0))
+            else:
+                flats.append(struct.pack("<II", len(entries), 1) + b"".join(entries))
+        sections.append((b"FLAT", _records(flats)))
+    f.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+    for tag, payload in sections:
+        f.write(SECTION.pack(tag, 0, len(payload)))
+        f.write(payload)
+        f.write(bytes(_pad(len(payload))))
+
+def sections(buffer):
+    # Maps the tag of every section to the offset and length of its payload.
+    magic, version, count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("not a binary cookbook")
+    if version != VERSION:
+        raise ValueError(f"unsupported binary cookbook version {version}")
+    found = {}
+    offset = HEADER.size
+    for _ in range(count):
+        tag, _, length = SECTION.unpack_from(buffer, offset)
+        offset += SECTION.size
+        if offset + length > len(buffer):
+            raise ValueError("truncated binary cookbook")
+        found[tag.decode("ascii")] = (offset, length)
+        offset += length + _pad(length)
+    return found
+
+def read_strings(buffer, offset):
+    count, = COUNT.unpack_from(buffer, offset)
+    offsets = struct.unpack_from(f"<{count + 1}Q", buffer, offset + COUNT.size)
+    start = offset + COUNT.size + 8 * (count + 1)
+    text = bytes(buffer[start:start + offsets[-1]])
+    return [text[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+
+def decoder(places):
+    # Turns the numbers of a file with the given decimal places into
+    # quantities of the current amount mode.
+    current = fixed_point()
+    if current == None:
+        def decode(value):
+            value = Decimal(value).scaleb(-places)
+            if value == value.to_integral_value():
+                return value.quantize(1)
+            return value.normalize()
+    elif current == places:
+        decode = int
+    elif current > places:
+        factor = 10 ** (current - places)
+        decode = lambda value: value * factor
+    else:
+        divisor = 10 ** (places - current)
+        def decode(value):
+            whole, rest = divmod(value, divisor)
+            if rest:
+                raise ValueError(f"{Decimal(value).scaleb(-places)} has more than "
+                                 f"{current} decimal places")
+            return whole
+    return decode
+
+def _amount(decode, value):
+    if value < 0:
+        raise ValueError("expected non-negative amount")
+    return decode(value)
+
+def _link(cookbook, origin, ids, ref):
+    component = None
+    if ref < len(ids):
+        component = cookbook.link_component(origin, ids[ref])
+    if component == None:
+        raise ValueError(f"invalid component reference {ref}")
+    return component
+
+def load(cls, path, progress = None):
+    with open(path, "rb") as f:
+        buffer = memoryview(f.read())
+    found = sections(buffer)
+    for tag in ("STRS", "META", "INGR", "RECP", "PLAN"):
+        if tag not in found:
+            raise ValueError(f"binary cookbook without {tag} section")
+    strings = read_strings(buffer, found["STRS"][0])
+    places, _, seq = META.unpack_from(buffer, found["META"][0])
+    decode = decoder(places)
+
+    self = cls()
+    self._seq = seq
+    ids = []
+    offset, _ = found["INGR"]
+    count, = COUNT.unpack_from(buffer, offset)
+    for id_name, name, unit, _, calories in INGREDIENT.iter_unpack(
+            buffer[offset + COUNT.size:offset + COUNT.size + count * INGREDIENT.size]):
+        ids.append(strings[id_name])
+        self.register_ingredient(Ingredient(strings[id_name], strings[name],
+                                            decode(calories), strings[unit]))
+    if progress != None:
+        progress(0.1)
+
+    # All recipes are registered before any amounts are linked, since a
+    # recipe can use one that comes later in the file.
+    offset, _ = found["RECP"]
+    count, = COUNT.unpack_from(buffer, offset)
+    offsets = struct.unpack_from(f"<{count}Q", buffer, offset + COUNT.size)
+    pending = []
+    for start in offsets:
+        start += offset
+        id_name, name, category, steps, amounts, _ = RECIPE.unpack_from(buffer, start)
+        start += RECIPE.size
+        steps = [Step(strings[description], seconds) for description, _, seconds
+                 in ENTRY.iter_unpack(buffer[start:start + steps * ENTRY.size])]
+        start += len(steps) * ENTRY.size
+        ids.append(strings[id_name])
+        rec = Recipe(strings[id_name], self, strings[name], strings[category], steps)
+        if self.register_recipe(rec):
+            pending.append((rec, buffer[start:start + amounts * ENTRY.size]))
+    for i, (rec, entries) in enumerate(pending):
+        for ref, _, amount in ENTRY.iter_unpack(entries):
+            rec.amounts.append([_link(self, rec, ids, ref), _amount(decode, amount)])
+        if progress != None and i % 1024 == 0:
+            progress(0.1 + 0.8 * i / len(pending))
+
+    offset, _ = found["PLAN"]
+    count, = COUNT.unpack_from(buffer, offset)
+    offsets = struct.unpack_from(f"<{count}Q", buffer, offset + COUNT.size)
+    for start in offsets:
+        start += offset
+        name, days = PLAN.unpack_from(buffer, start)
+        start += PLAN.size
+        lengths = struct.unpack_from(f"<{days}I", buffer, start)
+        start += 4 * days + _pad(4 * days)
+        plan = Mealplan(self, strings[name])
+        for length in lengths:
+            day = Amounts()
+            for ref, _, amount in ENTRY.iter_unpack(buffer[start:start + length * ENTRY.size]):
+                day.append([_link(self, plan, ids, ref), _amount(decode, amount)])
+            start += length * ENTRY.size
+            plan._days.append(day)
+        # Built from the days the first time it is needed.
+        plan._shopping_list = None
+        self.register_mealplan(plan)
+    self.path = path
+    return self
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import sys
+
+from . import binary
+from .amounts import to_str, total_to_str, use_fixed_point
+from .cookbook import Cookbook, write_data
+from .journal import fold, has_journal
+from .recipe import Recipe
+
+# Command line interface for scripts and cron jobs. It only uses the model
+# layer, so it never imports PyQt6 and does not need a display. Results are
+# written to stdout as JSON lines, one object per line, as they are made;
+# cookbooks that cannot be read are reported the same way and the rest go on.
+
+def _open(path):
+    if path.endswith(".db"):
+        # Opening a database that is not there would create an empty one.
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No such file: '{path}'")
+        from .sqlite import SqliteCookbook
+        return SqliteCookbook.open(path)
+    return Cookbook.load(path)
+
+def _emit(obj):
+    sys.stdout.write(json.dumps(obj, ensure_ascii = False) + "\n")
+
+def _each_cookbook(paths, failed):
+    # Yields the cookbooks that could be opened and reports the others, which
+    # are also added to failed.
+    for path in paths:
+        try:
+            cookbook = _open(path)
+        except (OSError, ValueError, KeyError, ArithmeticError) as error:
+            _emit({"cookbook": path, "error": str(error)})
+            failed.append(path)
+            continue
+        yield path, cookbook
+
+def _amount_entry(component, text):
+    return {"id": component._id, "name": component.name,
+            "amount": text, "unit": component.unit}
+
+def kcal(args):
+    failed = []
+    for path, cookbook in _each_cookbook(args.cookbooks, failed):
+        for recipe in cookbook.recipes:
+            _emit({"cookbook": path, "id": recipe._id, "name": recipe.name,
+                   "servings": args.servings,
+                   "kcal": to_str(recipe.get_calories(args.servings))})
+    return not failed
+
+def scale(args):
+    cookbook = _open(args.cookbook)
+    ok = True
+    for id_name in args.recipes:
+        # Not get: SQLite cookbooks only look up components they have not
+        # read yet through indexing.
+        recipe = cookbook._components[id_name] if id_name in cookbook._components else None
+        if not isinstance(recipe, Recipe):
+            _emit({"id": id_name, "error": "no such recipe"})
+            ok = False
+            continue
+        _emit({"id": recipe._id, "name": recipe.name, "servings": args.servings,
+               "kcal": to_str(recipe.get_calories(args.servings)),
+               "amounts": [_amount_entry(component, to_str(amount))
+                           for component, amount in recipe.get_amounts(args.servings)],
+               "ingredients": sorted((_amount_entry(ing, to_str(amount)) for ing, amount
+                                      in recipe.get_ingredients(args.servings).items()),
+                                     key = lambda entry: entry["name"])})
+    return ok
+
+def _find_plans(cookbook, names):
+    # Plans by name or by number, counting from 1, or every plan.
+    if not names:
+        return [(i, plan, None) for i, plan in enumerate(cookbook.mealplans)]
+    found = []
+    for name in names:
+        matches = [(i, plan) for i, plan in enumerate(cookbook.mealplans)
+                   if plan.name == name]
+        if not matches and name.isdigit() and 1 <= int(name) <= len(cookbook.mealplans):
+            matches = [(int(name) - 1, cookbook.mealplans[int(name) - 1])]
+        if not matches:
+            found.append((None, None, name))
+        found.extend((i, plan, None) for i, plan in matches)
+    return found
+
+def shopping(args):
+    cookbook = _open(args.cookbook)
+    ok = True
+    for index, plan, missing in _find_plans(cookbook, args.plans):
+        if plan == None:
+            _emit({"plan": missing, "error": "no such meal plan"})
+            ok = False
+            continue
+        items = sorted(plan._get_shopping().items(), key = lambda entry: entry[0].name)
+        _emit({"plan": plan.name, "number": index + 1, "days": len(plan._days),
+               "kcal_per_day": plan.get_calories(),
+               "items": [_amount_entry(ing, total_to_str(amount)) for ing, amount in items]})
+    return ok
+
+def _raw_data(path):
+    # Loading a cookbook refuses bad recipes and leaves out meal plan entries
+    # it cannot link, so references are checked in the data itself. Binary
+    # files refer to components by position and cannot hold unknown ones.
+    if path.endswith(".db"):
+        return _open(path).export()
+    if binary.is_binary(path):
+        return Cookbook.load(path).export()
+    if has_journal(path):
+        return fold(path)
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _problems(data):
+    seen = set()
+    kinds = {}
+    for kind in ("ingredients", "recipes"):
+        for entry in data.get(kind, []):
+            if entry["id"] in seen:
+                yield {"problem": "duplicate id", "id": entry["id"]}
+            seen.add(entry["id"])
+            kinds[entry["id"]] = kind
+    uses = {}
+    for recipe in data.get("recipes", []):
+        for id_name, _ in recipe["amounts"]:
+            if id_name == recipe["id"]:
+                yield {"problem": "recipe uses itself", "recipe": recipe["id"]}
+            elif id_name not in kinds:
+                yield {"problem": "unknown component", "recipe": recipe["id"],
+                       "component": id_name}
+            elif kinds[id_name] == "recipes":
+                uses.setdefault(recipe["id"], []).append(id_name)
+    for cycle in _cycles(uses):
+        yield {"problem": "cycle", "recipes": cycle}
+    for i, plan in enumerate(data.get("mealplans", [])):
+        for day, entries in enumerate(plan["days"]):
+            for id_name, _ in entries:
+                if id_name not in kinds:
+                    yield {"problem": "unknown component", "plan": plan["name"],
+                           "number": i + 1, "day": day + 1, "component": id_name}
+
+def _cycles(uses):
+    # One cycle for each group of recipes that use each other, found with an
+    # iterative depth-first search.
+    state = {}
+    for root in uses:
+        if root in state:
+            continue
+        path = [root]
+        state[root] = "open"
+        stack = [iter(uses.get(root, ()))]
+        while stack:
+            child = next(stack[-1], None)
+            if child == None:
+                state[path.pop()] = "done"
+                stack.pop()
+            elif state.get(child) == "open":
+                yield path[path.index(child):]
+            elif child not in state:
+                state[child] = "open"
+                path.append(child)
+                stack.append(iter(uses.get(child, ())))
+
+def validate(args):
+    ok = True
+    for path in args.cookbooks:
+        try:
+            data = _raw_data(path)
+        except (OSError, ValueError, KeyError, ArithmeticError) as error:
+            _emit({"cookbook": path, "error": str(error)})
+            ok = False
+            continue
+        count = 0
+        for problem in _problems(data):
+            _emit(dict(cookbook = path, **problem))
+            count += 1
+        _emit({"cookbook": path, "valid": count == 0, "problems": count})
+        ok = ok and count == 0
+    return ok
+
+def convert(args):
+    cookbook = _open(args.source)
+    if args.target.endswith(".db"):
+        from .sqlite import SqliteCookbook
+        SqliteCookbook.create(args.target, cookbook)
+    else:
+        write_data(args.target, cookbook.export())
+    _emit({"from": args.source, "to": args.target,
+           "ingredients": len(cookbook.ingredients), "recipes": len(cookbook.recipes),
+           "mealplans": len(cookbook.mealplans)})
+    return True
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog = "kytchen-cli",
+        description = "Batch operations on cookbooks, with JSON lines on stdout.")
+    parser.add_argument("--fixed-point", type = int, default = 0, metavar = "PLACES",
+                        help = "keep amounts as integers with this many decimal places")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    command = commands.add_parser("kcal", help = "calories of every recipe")
+    command.add_argument("cookbooks", nargs = "+")
+    command.add_argument("--servings", type = int, default = 1)
+    command.set_defaults(run = kcal)
+
+    command = commands.add_parser("scale", help = "amounts of recipes for some servings")
+    command.add_argument("cookbook")
+    command.add_argument("servings", type = int)
+    command.add_argument("recipes", nargs = "+", metavar = "recipe")
+    command.set_defaults(run = scale)
+
+    command = commands.add_parser("shopping", help = "shopping lists of meal plans")
+    command.add_argument("cookbook")
+    command.add_argument("plans", nargs = "*", metavar = "plan",
+                         help = "name or number of a meal plan; every plan if none")
+    command.set_defaults(run = shopping)
+
+    command = commands.add_parser("validate", help = "check the references between components")
+    command.add_argument("cookbooks", nargs = "+")
+    command.set_defaults(run = validate)
+
+    command = commands.add_parser("convert", help = "save a cookbook in another format")
+    command.add_argument("source")
+    command.add_argument("target", help = "a .js, .kyb or .db file")
+    command.set_defaults(run = convert)
+    return parser
+
+def main(argv = None):
+    args = _parser().parse_args(argv)
+    if args.fixed_point > 0:
+        use_fixed_point(args.fixed_point)
+    try:
+        ok = args.run(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, as with head. Whatever is still buffered
+        # goes nowhere instead of failing again at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError, KeyError, ArithmeticError) as error:
+        sys.stdout.flush()
+        print(f"kytchen-cli: {error}", file = sys.stderr)
+        return 2
+    return 0 if ok else 1
@@ -1,14 +1,29 @@
 import json
-from decimal import Decimal
+import os
+from contextlib import contextmanager
 
 from .ingredient import Ingredient
 from .recipe import Recipe
 from .mealplan import Mealplan
-from .views import show_error
+from .stream import iter_sections
+from .journal import Journal, fold, has_journal
+from .search import SearchIndex
+from .files import atomic_write
+from . import binary
+
+def write_data(path, data):
+    # Writes export data in the format that goes with the file extension.
+    if binary.is_binary(path):
+        with atomic_write(path, "wb") as f:
+            binary.dump(data, f)
+    else:
+        with atomic_write(path) as f:
+            json.dump(data, f)
 
 def can_delete_component(component, view = None):
     if component._used:
         if view:
+            from .views import show_error
             used_name = list(component._used.keys())[0].name
             show_error(view,
                 f"Cannot delete {component.name}. It is used in {used_name}.")
@@ -24,11 +39,84 @@ class Cookbook():
         self.mealplans = []
         self.path = None
         self.window = None
+        self.journal = None
+        self._seq = 0
+        self._next_order = 0
+        # Called with every ingredient, recipe or meal plan whose displayed
+        # values may have changed.
+        self.watchers = []
+        self._search = None
+        # Export data of every object that has not changed since it was last
+        # snapshotted. These dicts are never modified, only replaced.
+        self._exports = {}
+        # Inside a batch, the objects that changed (and whether they still
+        # have to be journaled) and the ones that only need a notify.
+        self._batch = 0
+        self._changes = {}
+        self._notices = {}
 
     @classmethod
-    def load(cls, path):
+    def load(cls, path, journal = False, progress = None):
+        # progress, if given, is called with the fraction of the file that
+        # has been read, from 0 to 1. It may raise to stop loading.
+        if binary.is_binary(path):
+            self = binary.load(cls, path, progress)
+        elif has_journal(path):
+            data = fold(path)
+            self = cls.from_data(data, path)
+            self._seq = data["seq"]
+        else:
+            self = cls._load_stream(path, progress)
+        # The last call to progress may still stop loading, so nothing that
+        # needs closing is opened before it.
+        if progress != None:
+            progress(1.0)
+        if journal:
+            self.open_journal()
+        return self
+
+    @classmethod
+    def _load_stream(cls, path, progress = None):
+        self = cls()
+        # Recipes may use recipes that appear later in the file. Those are
+        # registered as empty placeholders and filled in when they show up.
+        pending = {}
+        read = None
+        if progress != None:
+            size = max(os.path.getsize(path), 1)
+            read = lambda count: progress(min(count / size, 1.0))
         with open(path, "r") as f:
-            data = json.load(f)
+            for section, data in iter_sections(f, progress = read):
+                if section == "ingredients":
+                    self.register_ingredient(Ingredient.load(data))
+                elif section == "recipes":
+                    self._load_recipe(data, pending)
+                elif section == "mealplans":
+                    self.register_mealplan(Mealplan.load(data, self))
+                elif section == "seq":
+                    self._seq = data
+        if pending:
+            raise ValueError(f"invalid component ID '{next(iter(pending))}'")
+        self.path = path
+        return self
+
+    def _load_recipe(self, data, pending):
+        rec = pending.pop(data["id"], None)
+        if rec == None:
+            rec = Recipe.load_steps(data, self)
+            if not self.register_recipe(rec):
+                return
+        else:
+            rec.fill_steps(data)
+            self.recipes.append(rec)
+        for id_name, _ in data["amounts"]:
+            if id_name not in self._components:
+                pending[id_name] = Recipe(id_name, self)
+                self.register_component(pending[id_name])
+        rec.load_amounts(data)
+
+    @classmethod
+    def from_data(cls, data, path = None):
         self = cls()
         for ing in data["ingredients"]:
             ing = Ingredient.load(ing)
@@ -44,7 +132,7 @@ class Cookbook():
         self.path = path
         return self
 
-    def save(self, path = None):
+    def export(self):
         data = {"ingredients": [], "recipes": [], "mealplans": []}
         for ing in self.ingredients:
             data["ingredients"].append(ing.export())
@@ -52,17 +140,202 @@ class Cookbook():
             data["recipes"].append(rec.export())
         for plan in self.mealplans:
             data["mealplans"].append(plan.export())
+        seq = self.journal.seq if self.journal != None else self._seq
+        if seq:
+            # Journal records up to here are already part of this data.
+            data["seq"] = seq
+        return data
+
+    def snapshot(self):
+        # Same data as export, sharing the entries of unchanged objects with
+        # earlier snapshots. It is only valid if every change was reported
+        # through changed(), as the views do; it can then be written out on
+        # another thread while editing goes on.
+        exports = self._exports
+        def export(obj):
+            data = exports.get(obj)
+            if data == None:
+                data = exports[obj] = obj.export()
+            return data
+        data = {"ingredients": [export(ing) for ing in self.ingredients],
+                "recipes": [export(rec) for rec in self.recipes],
+                "mealplans": [export(plan) for plan in self.mealplans]}
+        seq = self.journal.seq if self.journal != None else self._seq
+        if seq:
+            data["seq"] = seq
+        return data
+
+    def save(self, path = None):
         if path == None:
             path = self.path
-        with open(path, "w") as f:
-            json.dump(data, f)
+        if self.journal != None and path == self.path:
+            self.journal.flush()
+            if self.journal.size() > self.journal.compact_size:
+                self.journal.compact()
+            return
+        write_data(path, self.export())
+
+    def open_journal(self):
+        # From now on, every change is appended to a journal next to the
+        # cookbook file, and save only has to flush it.
+        if self.journal != None:
+            return
+        if binary.is_binary(self.path):
+            raise ValueError("journals need a JSON cookbook file")
+        if not os.path.exists(self.path):
+            self.save()
+        self.journal = Journal(self.path, self._seq)
+
+    def close(self):
+        if self.journal != None:
+            self.journal.close()
+            self._seq = self.journal.seq
+            self.journal = None
+
+    def notify(self, obj):
+        if self._batch:
+            self._notices[obj] = None
+            return
+        for watcher in self.watchers:
+            watcher(obj)
+
+    @contextmanager
+    def batch(self):
+        # Every object changed inside is reported once when the outermost
+        # batch ends, instead of on every change: watchers, the search index
+        # and the journal only see its final state.
+        self._batch += 1
+        try:
+            yield self
+        finally:
+            self._batch -= 1
+            if self._batch == 0:
+                self._end_batch()
+
+    def _end_batch(self):
+        changes, self._changes = self._changes, {}
+        notices, self._notices = self._notices, {}
+        for obj in notices:
+            if obj not in changes:
+                self.notify(obj)
+        for obj, pending in changes.items():
+            self.notify(obj)
+            if self._search != None:
+                self._search.add(obj)
+            self._journal_pending(obj, pending)
+
+    def _journal_pending(self, obj, pending):
+        # What a batch has for an object: True for the whole object, or the
+        # records of its edits, none if they were already written.
+        if pending == True:
+            self._journal(obj)
+        elif self.journal != None:
+            for record in pending:
+                self.journal.append(record)
+
+    def _journal_changes(self):
+        # Renames and deletions are journaled right away, so the changes
+        # before them have to be written first.
+        for obj, pending in self._changes.items():
+            self._journal_pending(obj, pending)
+            self._changes[obj] = []
+
+    def search_index(self):
+        # Built on first use, then kept up to date by the hooks below.
+        if self._search == None:
+            self._search = SearchIndex()
+            for objects in (self.ingredients, self.recipes, self.mealplans):
+                for obj in objects:
+                    self._search.add(obj)
+        return self._search
+
+    def changed(self, obj, edit = None):
+        # edit, for an edit of a single entry of a recipe or meal plan, is a
+        # function that returns a journal record of just that edit, which is
+        # then written instead of the whole object. It is only called if the
+        # record is needed, and right away, while it still describes the
+        # current state.
+        self._exports.pop(obj, None)
+        if self._batch:
+            pending = self._changes.get(obj, [])
+            if pending == True or edit == None or self.journal == None:
+                self._changes[obj] = True
+            else:
+                record = self._edit_record(obj, edit)
+                if record == None:
+                    self._changes[obj] = True
+                else:
+                    pending.append(record)
+                    self._changes[obj] = pending
+            return
+        self.notify(obj)
+        if self._search != None:
+            self._search.add(obj)
+        if edit != None and self.journal != None:
+            record = self._edit_record(obj, edit)
+            if record != None:
+                self.journal.append(record)
+                return
+        self._journal(obj)
+
+    def _edit_record(self, obj, edit):
+        # Edits say which recipe or meal plan they belong to here, where
+        # the position of the plan is known. None for a meal plan that is
+        # not in the cookbook.
+        record = edit()
+        if isinstance(obj, Recipe):
+            record["recipe"] = obj._id
+        elif obj in self.mealplans:
+            record["plan"] = self.mealplans.index(obj)
+        else:
+            return None
+        return record
+
+    def _journal(self, obj):
+        if self.journal == None:
+            return
+        if isinstance(obj, Ingredient):
+            self.journal.append({"op": "ingredient", "data": obj.export()})
+        elif isinstance(obj, Recipe):
+            self.journal.append({"op": "recipe", "data": obj.export()})
+        elif isinstance(obj, Mealplan) and obj in self.mealplans:
+            self.journal.append({"op": "mealplan",
+                "index": self.mealplans.index(obj), "data": obj.export()})
+
+    def renamed(self, component, old):
+        # Everything that uses the component exports its id.
+        self._exports.pop(component, None)
+        for user in component._used:
+            self._exports.pop(user, None)
+        self.notify(component)
+        if self._search != None:
+            self._search.add(component)
+        if self.journal != None:
+            self._journal_changes()
+            self.journal.append({"op": "rename", "old": old, "new": component._id})
+
+    def removed(self, obj, index):
+        self._exports.pop(obj, None)
+        if self._search != None:
+            self._search.remove(obj)
+        if self.journal != None:
+            self._journal_changes()
+        self._changes.pop(obj, None)
+        self._notices.pop(obj, None)
+        if self.journal == None:
+            return
+        if isinstance(obj, Mealplan):
+            self.journal.append({"op": "delete_mealplan", "index": index})
+        else:
+            self.journal.append({"op": "delete", "id": obj._id})
 
     def set_path(self, path):
         self.path = path
 
     def get_name(self):
         if self.path != None:
-            return self.path.split("/")[-1].split("\\")[-1].strip(".js")
+            name = self.path.split("/")[-1].split("\\")[-1]
+            return os.path.splitext(name)[0]
         else:
             return "New cookbook"
 
@@ -75,25 +348,63 @@ class Cookbook():
     def register_ingredient(self, ingredient):
         if self.register_component(ingredient):
             self.ingredients.append(ingredient)
+            self.changed(ingredient)
             return True
         else:
             return False
 
+    def register_ingredients(self, ingredients, update = False):
+        # Registers many ingredients at once and returns the ones whose ID
+        # was already taken, and how many ingredients were modified. With
+        # update, those take over the name, calories and unit of the
+        # ingredient that has their ID instead, which only counts if any of
+        # them differ, and only the ones that clash with a recipe are
+        # returned.
+        components = self._components
+        added = []
+        rejected = []
+        updated = 0
+        for ing in ingredients:
+            # Not get: SQLite cookbooks only look up components they have not
+            # read yet through in and indexing.
+            old = components[ing._id] if ing._id in components else None
+            if old == None:
+                components[ing._id] = ing
+                added.append(ing)
+            elif update and isinstance(old, Ingredient):
+                if (old.name, old.calories, old.unit) != (ing.name, ing.calories, ing.unit):
+                    old.name = ing.name
+                    old.unit = ing.unit
+                    if old.calories != ing.calories:
+                        old.calories = ing.calories
+                    self.changed(old)
+                    updated += 1
+            else:
+                rejected.append(ing)
+        self.ingredients.extend(added)
+        for ing in added:
+            self.changed(ing)
+        return rejected, updated
+
     def register_recipe(self, recipe):
         if self.register_component(recipe):
             self.recipes.append(recipe)
+            self.changed(recipe)
             return True
         else:
             return False
 
     def register_mealplan(self, mealplan):
         self.mealplans.append(mealplan)
+        self.changed(mealplan)
 
     def update_component_id(self, component, new):
         if new in self._components:
             return False
-        self._components[new] = self._components.pop(component._id)
+        old = component._id
+        self._components[new] = self._components.pop(old)
         component._id = new
+        self.renamed(component, old)
         return True
 
     def delete_ingredient(self, index, view = None):
@@ -101,33 +412,102 @@ class Cookbook():
         if can_delete_component(ing, view):
             del self.ingredients[index]
             del self._components[ing._id]
+            self.removed(ing, index)
 
     def delete_recipe(self, index, view = None):
         recipe = self.recipes[index]
+        if not can_delete_component(recipe, view):
+            return
         if recipe.window != None:
             recipe.window.deleteLater()
         for component, _ in recipe.amounts:
             self.unlink_component(recipe, component)
-        if can_delete_component(recipe, view):
-            del self.recipes[index]
-            del self._components[recipe._id]
+        del self.recipes[index]
+        del self._components[recipe._id]
+        self.removed(recipe, index)
 
     def delete_mealplan(self, index):
         mealplan = self.mealplans[index]
+        if self.journal != None:
+            # Meal plans are journaled by position, which is about to move.
+            self._journal_changes()
         mealplan._clear()
         del self.mealplans[index]
+        self.removed(mealplan, index)
 
     def link_component(self, origin, name_id):
         if name_id in self._components:
             obj = self._components[name_id]
             if obj == origin:
                 return None
+            if (isinstance(origin, Recipe) and isinstance(obj, Recipe)
+                    and not self._place_link(origin, obj)):
+                return None
             obj._used.setdefault(origin, 0)
             obj._used[origin] += 1
             return obj
         else:
             return None
 
+    def _place_link(self, origin, component):
+        # Recipes are numbered so that every recipe comes after the recipes it
+        # uses (Pearce and Kelly's dynamic topological order). A new link only
+        # visits the recipes numbered between its two ends, and is refused if
+        # the component turns out to use the origin already.
+        for recipe in (origin, component):
+            if recipe._order == None:
+                recipe._order = self._next_order
+                self._next_order += 1
+        lower = origin._order
+        upper = component._order
+        if upper < lower:
+            return True
+        forward = []
+        stack = [origin]
+        seen = {origin}
+        while stack:
+            recipe = stack.pop()
+            forward.append(recipe)
+            for user in recipe._used:
+                if user is component:
+                    return False
+                if (isinstance(user, Recipe) and user not in seen
+                        and user._order < upper):
+                    seen.add(user)
+                    stack.append(user)
+        backward = []
+        stack = [component]
+        seen = {component}
+        while stack:
+            recipe = stack.pop()
+            backward.append(recipe)
+            for used, _ in recipe.amounts:
+                if (isinstance(used, Recipe) and used not in seen
+                        and used._order > lower):
+                    seen.add(used)
+                    stack.append(used)
+        # The component and what it uses take the lowest of the numbers
+        # involved, the origin and its users the rest, each keeping its order.
+        backward.sort(key = lambda recipe: recipe._order)
+        forward.sort(key = lambda recipe: recipe._order)
+        moved = backward + forward
+        slots = sorted(recipe._order for recipe in moved)
+        for recipe, slot in zip(moved, slots):
+            recipe._order = slot
+        return True
+
+    def recipes_in_order(self):
+        # Every recipe after all the recipes it uses.
+        return sorted(self.recipes, key = lambda recipe:
+                      -1 if recipe._order == None else recipe._order)
+
+    def evaluate_recipes(self):
+        # Fills the calorie and ingredient caches bottom-up, so that no
+        # recipe has to recurse into its sub-recipes.
+        for recipe in self.recipes_in_order():
+            recipe._flat()
+            recipe.get_calories()
+
     def unlink_component(self, origin, old):
         old._used[origin] -= 1
         if old._used[origin] == 0:
@@ -142,3 +522,8 @@ class Cookbook():
 
     def is_empty(self):
         return len(self._components) == 0
+
+    def nutrition_matrix(self):
+        # Optional: needs numpy and scipy.
+        from .matrix import NutritionMatrix
+        return NutritionMatrix(self)
@@ -0,0 +1,24 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_write(path, mode = "w"):
+    # Write next to the target and rename over it, so a crash in the middle
+    # never leaves a half-written file behind.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir = directory, prefix = ".kytchen-")
+    try:
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode)
+        else:
+            os.chmod(tmp, 0o644)
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
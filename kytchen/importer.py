@@ -0,0 +1,145 @@
+import csv
+import gc
+import os
+from itertools import islice
+
+from .amounts import num
+from .ingredient import Ingredient
+
+# Ingredients from CSV files. The first row names the columns: id is
+# required, and name, calories and unit are read when present; any other
+# column is ignored. The file is read and parsed a chunk of rows at a time,
+# so only the ingredients themselves stay in memory.
+
+CHUNK_SIZE = 10000
+
+# What to do with a row whose id is already taken.
+ERROR = "error"
+SKIP = "skip"
+UPDATE = "update"
+
+class IdConflict(ValueError):
+    def __init__(self, ids):
+        self.ids = ids
+        shown = ", ".join(ids[:5])
+        if len(ids) > 5:
+            shown += ", ..."
+        super().__init__(f"{len(ids)} IDs are already in use: {shown}")
+
+class ImportReport():
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        # IDs of the rows that were left out.
+        self.skipped = []
+
+def _open(path):
+    # utf-8-sig drops the byte order mark that spreadsheets like to add.
+    return open(path, "r", newline = "", encoding = "utf-8-sig")
+
+def read_chunks(f, chunk_size = CHUNK_SIZE):
+    # Chunks as columns rather than rows: row numbers (the header is row 1),
+    # then the ids, names, calories and units as text. Blank rows are left
+    # out.
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header == None:
+        return
+    names = [name.strip().casefold() for name in header]
+    if "id" not in names:
+        raise ValueError("CSV file without an id column")
+    columns = [names.index(name) if name in names else None
+               for name in ("id", "name", "calories", "unit")]
+    width = max(i for i in columns if i != None) + 1
+    first = 2
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            return
+        numbers = range(first, first + len(rows))
+        first += len(rows)
+        if min(map(len, rows)) < width:
+            padded = [(number, row + [""] * (width - len(row)))
+                      for number, row in zip(numbers, rows) if any(row)]
+            if not padded:
+                continue
+            numbers, rows = zip(*padded)
+        fields = list(zip(*rows))
+        yield [list(numbers)] + [
+            [field.strip() for field in fields[i]] if i != None else [""] * len(rows)
+            for i in columns]
+
+def _calories(numbers, column):
+    try:
+        return [num(value) if value != "" else num(0) for value in column]
+    except (ArithmeticError, ValueError):
+        # Find the row to blame.
+        for number, value in zip(numbers, column):
+            try:
+                num(value) if value != "" else None
+            except (ArithmeticError, ValueError):
+                raise ValueError(f"row {number}: invalid calories '{value}'")
+        raise
+
+def parse_chunk(chunk):
+    numbers, ids, names, calories, units = chunk
+    calories = _calories(numbers, calories)
+    ingredients = []
+    for number, id_name, name, kcal, unit in zip(numbers, ids, names, calories, units):
+        if id_name == "":
+            if name == "" and unit == "" and kcal == 0:
+                continue
+            raise ValueError(f"row {number}: missing ID")
+        ingredients.append(Ingredient(id_name, name, kcal, unit))
+    return ingredients
+
+def find_conflicts(cookbook, path, chunk_size = CHUNK_SIZE):
+    # IDs in the file that are already in the cookbook or appear twice.
+    conflicts = []
+    seen = set()
+    with _open(path) as f:
+        for chunk in read_chunks(f, chunk_size):
+            for id_name in chunk[1]:
+                if id_name in seen or id_name in cookbook._components:
+                    conflicts.append(id_name)
+                if id_name != "":
+                    seen.add(id_name)
+    return conflicts
+
+def import_ingredients(cookbook, path, on_conflict = ERROR,
+                       chunk_size = CHUNK_SIZE, progress = None):
+    # With ERROR, the whole file is checked first and nothing is imported if
+    # any ID is taken. Otherwise, chunks are added as they are parsed, and a
+    # row with a bad value stops the import after the chunks before it.
+    if on_conflict not in (ERROR, SKIP, UPDATE):
+        raise ValueError(f"unknown conflict mode '{on_conflict}'")
+    if on_conflict == ERROR:
+        conflicts = find_conflicts(cookbook, path, chunk_size)
+        if conflicts:
+            raise IdConflict(conflicts)
+    report = ImportReport()
+    # The new ingredients cannot form reference cycles, so collecting cycles
+    # while millions of them pile up would only scan them over and over.
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        _import(cookbook, path, on_conflict, chunk_size, progress, report)
+    finally:
+        if collect:
+            gc.enable()
+    return report
+
+def _import(cookbook, path, on_conflict, chunk_size, progress, report):
+    with _open(path) as f:
+        size = max(os.fstat(f.fileno()).st_size, 1)
+        for chunk in read_chunks(f, chunk_size):
+            ingredients = parse_chunk(chunk)
+            count = len(cookbook.ingredients)
+            rejected, updated = cookbook.register_ingredients(
+                ingredients, update = on_conflict == UPDATE)
+            report.added += len(cookbook.ingredients) - count
+            report.updated += updated
+            report.skipped.extend(ing._id for ing in rejected)
+            if progress != None:
+                # The text layer reads ahead, so this is where it has got to.
+                progress(min(f.buffer.tell() / size, 1.0))
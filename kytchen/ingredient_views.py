@@ -0,0 +1,106 @@
+import os
+
+from PyQt6.QtWidgets import QPushButton, QFileDialog, QMessageBox
+
+from .views import SortTableModel, SortTable, create_new, show_error
+from .amounts import num
+from .cookbook import can_delete_component
+from .ingredient import Ingredient
+from .importer import import_ingredients, find_conflicts, SKIP, UPDATE
+
+
+class IngredientModel(SortTableModel):
+    header_names = ["ID", "Ingredient", "kcal/unit", "Unit"]
+    align = ["", "left", "", ""]
+
+    def __init__(self, parent, cookbook):
+        self.cookbook = cookbook
+        super().__init__(parent, cookbook.ingredients, cookbook)
+
+    def get_data(self, row, col):
+        ing = self.content[row]
+        return ing._col(col)
+
+
+    def set_data(self, row, col, value):
+        ing = self.content[row]
+        if col == 0:
+            self.cookbook.update_component_id(ing, value) 
+        elif col == 1:
+            ing.name = value
+        elif col == 2:
+            try:
+                value = num(value)
+            except:
+                return False
+            ing.calories = value
+        elif col == 3:
+            ing.unit = value
+        if col != 0:
+            self.cookbook.changed(ing)
+
+        return True        
+
+    def new_entry(self):
+        def create_function(new_id):
+            ing = Ingredient(new_id)
+            return self.cookbook.register_ingredient(ing)
+        create_new(self.parent(), "ingredient", create_function)
+    
+    def can_delete_entry(self, row):
+        return can_delete_component(self.content[row], self.parent())
+
+    def delete_entry(self, row):
+        self.cookbook.delete_ingredient(row, self.parent())
+
+    def import_entries(self, path):
+        view = self.parent()
+        try:
+            conflicts = find_conflicts(self.cookbook, path)
+        except (OSError, ValueError) as error:
+            show_error(view, f"Could not import {path}: {error}")
+            return
+        mode = SKIP
+        if conflicts:
+            answer = QMessageBox.question(view, "Import ingredients",
+                f"{len(conflicts)} IDs in {os.path.basename(path)} are already in use. "
+                "Do you want to update those ingredients? Otherwise, they are skipped.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                | QMessageBox.StandardButton.Cancel)
+            if answer == QMessageBox.StandardButton.Cancel:
+                return
+            if answer == QMessageBox.StandardButton.Yes:
+                mode = UPDATE
+        errors = []
+        def create():
+            # A bad row stops the import, but the rows before it are in.
+            try:
+                import_ingredients(self.cookbook, path, mode)
+            except (OSError, ValueError) as error:
+                errors.append(error)
+        self.general_new_row(create)
+        if errors:
+            show_error(view, f"Could not import all of {path}: {errors[0]}")
+
+ 
+class IngredientTable(SortTable):
+    ModelClass = IngredientModel
+    item_name = "ingredient"
+    default_widths = [(0, 150), (2, 100), (3, 100)]
+    fixed_widths = [2, 3]
+    stretch_widths = [1]
+
+    def __init__(self, content):
+        super().__init__(content)
+        import_button = QPushButton("Import CSV")
+        import_button.clicked.connect(self.import_csv)
+        self.control_bar.insertWidget(self.control_bar.count() - 1, import_button)
+
+    def import_csv(self):
+        path, ok = QFileDialog.getOpenFileName(self, "Import ingredients", "",
+                                               "CSV files (*.csv)")
+        if ok and path:
+            self.model.import_entries(path)
+
+
+
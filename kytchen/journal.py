@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+
+from .files import atomic_write
+
+# A journaled cookbook is a snapshot (an ordinary cookbook file with an extra
+# "seq" entry) plus an append-only file of JSON records, one per line, each
+# describing one change made after the snapshot was written: a whole
+# ingredient, recipe or meal plan, or a single entry of a recipe or of a day
+# of a meal plan. Compaction folds the records into a new snapshot without
+# touching the live cookbook.
+
+def journal_path(path):
+    return path + ".journal"
+
+def compacting_path(path):
+    return path + ".journal.compacting"
+
+def has_journal(path):
+    return (os.path.exists(journal_path(path))
+            or os.path.exists(compacting_path(path)))
+
+def read_records(path):
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Only the last line can be cut short by a crash.
+                return
+            yield record
+
+def _rename(data, old, new):
+    for section in ("ingredients", "recipes"):
+        entries = data[section]
+        if old in entries:
+            entry = dict(entries[old], id = new)
+            data[section] = {(new if k == old else k): (entry if k == old else v)
+                             for k, v in entries.items()}
+    for recipe in data["recipes"].values():
+        for row in recipe["amounts"]:
+            if row[0] == old:
+                row[0] = new
+    for plan in data["mealplans"]:
+        for day in plan["days"]:
+            for row in day:
+                if row[0] == old:
+                    row[0] = new
+
+def _entries(data, record):
+    # The amounts of a recipe or the entries of a day of a meal plan.
+    if "recipe" in record:
+        return data["recipes"][record["recipe"]]["amounts"]
+    return data["mealplans"][record["plan"]]["days"][record["day"]]
+
+def apply_record(data, record):
+    op = record["op"]
+    if op == "ingredient" or op == "recipe":
+        data[op + "s"][record["data"]["id"]] = record["data"]
+    elif op == "rename":
+        _rename(data, record["old"], record["new"])
+    elif op == "delete":
+        data["ingredients"].pop(record["id"], None)
+        data["recipes"].pop(record["id"], None)
+    elif op == "mealplan":
+        plans = data["mealplans"]
+        if record["index"] == len(plans):
+            plans.append(record["data"])
+        else:
+            plans[record["index"]] = record["data"]
+    elif op == "delete_mealplan":
+        del data["mealplans"][record["index"]]
+    elif op == "set_entry":
+        _entries(data, record)[record["entry"]] = record["data"]
+    elif op == "insert_entry":
+        _entries(data, record).insert(record["entry"], record["data"])
+    elif op == "delete_entry":
+        del _entries(data, record)[record["entry"]]
+    elif op == "new_day":
+        data["mealplans"][record["plan"]]["days"].append([])
+    elif op == "delete_day":
+        del data["mealplans"][record["plan"]]["days"][record["day"]]
+    else:
+        raise ValueError(f"unknown journal record '{op}'")
+
+def fold(path):
+    # Snapshot plus every record written after it, as cookbook file data.
+    data = {"ingredients": [], "recipes": [], "mealplans": [], "seq": 0}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            data.update(json.load(f))
+    data["ingredients"] = {ing["id"]: ing for ing in data["ingredients"]}
+    data["recipes"] = {rec["id"]: rec for rec in data["recipes"]}
+    seq = data.get("seq", 0)
+    for name in (compacting_path(path), journal_path(path)):
+        for record in read_records(name):
+            if record["seq"] <= seq:
+                continue
+            apply_record(data, record)
+            seq = record["seq"]
+    data["ingredients"] = list(data["ingredients"].values())
+    data["recipes"] = list(data["recipes"].values())
+    data["seq"] = seq
+    return data
+
+class Journal():
+    compact_size = 1 << 20
+
+    def __init__(self, path, seq = 0):
+        self.path = path
+        self.seq = seq
+        self._lock = threading.Lock()
+        self._file = open(journal_path(path), "a")
+        self._thread = None
+
+    def append(self, record):
+        with self._lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            self._file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def size(self):
+        with self._lock:
+            return self._file.tell()
+
+    def _rotate(self):
+        # Hand the current records over to compaction and start a new file.
+        with self._lock:
+            self._file.close()
+            current = journal_path(self.path)
+            pending = compacting_path(self.path)
+            if os.path.exists(pending):
+                # A previous compaction did not finish: keep its records too.
+                with open(current, "r") as src, open(pending, "a") as dst:
+                    dst.write(src.read())
+                os.remove(current)
+            else:
+                os.replace(current, pending)
+            self._file = open(current, "a")
+
+    def _compact(self):
+        pending = compacting_path(self.path)
+        data = fold(self.path)
+        with atomic_write(self.path) as f:
+            json.dump(data, f)
+        # Records that made it into the snapshot are skipped on replay, so
+        # a crash before this line cannot apply them twice.
+        os.remove(pending)
+
+    def compact(self, wait = False):
+        if self._thread != None and self._thread.is_alive():
+            if wait:
+                self._thread.join()
+            return
+        self.flush()
+        self._rotate()
+        self._thread = threading.Thread(target = self._compact, daemon = True)
+        self._thread.start()
+        if wait:
+            self._thread.join()
+
+    def close(self):
+        if self._thread != None:
+            self._thread.join()
+        self.flush()
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,392 @@
+import math
+import mmap
+import os
+import struct
+from decimal import Decimal
+
+from . import binary
+from .amounts import fixed_point, mul, one, rescale, times, to_decimal, to_str, total_to_str
+from .files import atomic_write
+from .recipe import Step, time_string
+
+# Read-only cookbooks straight from a memory-mapped binary file (see
+# binary.py). Nothing is decoded up front: every ingredient, recipe or meal
+# plan is read from the file when it is asked for, and forgotten again, so
+# any number of processes that open the same file share one copy of it in
+# the page cache. Files written by write_mapped also carry the expanded
+# ingredients of every recipe, so recipes and shopping lists do not need to
+# walk their sub-recipes. Those are exact, while in fixed-point mode a loaded
+# cookbook rounds at every level of sub-recipes; in that mode they are left
+# aside and recipes are worked out here the same way, so amounts, calories
+# and shopping lists always read the same as from a loaded cookbook.
+
+def write_mapped(cookbook, path):
+    with atomic_write(path, "wb") as f:
+        binary.dump(cookbook.export(), f, flat = True)
+
+def _share_decoder():
+    # Turns coefficient * 10**exponent into a quantity of the current amount
+    # mode, rounding half away from zero in fixed-point mode.
+    places = fixed_point()
+    if places == None:
+        return lambda coefficient, exponent: Decimal(coefficient).scaleb(exponent)
+    def decode(coefficient, exponent):
+        shift = places + exponent
+        if shift >= 0:
+            return coefficient * 10 ** shift
+        scale = 10 ** -shift
+        half = scale // 2
+        if coefficient >= 0:
+            return (coefficient + half) // scale
+        return -((half - coefficient) // scale)
+    return decode
+
+class _Records():
+    # Read-only sequence of the objects of one kind, made on access.
+    def __init__(self, count, make):
+        self._count = count
+        self._make = make
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("cookbook index out of range")
+        return self._make(index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._make(i)
+
+class _Mapped():
+    # Objects of a mapped cookbook are equal if they are the same record, so
+    # they work as dict keys like the objects of a loaded cookbook.
+    __slots__ = ("cookbook", "_index")
+
+    def __eq__(self, other):
+        return (type(other) == type(self) and other.cookbook is self.cookbook
+                and other._index == self._index)
+
+    def __hash__(self):
+        return hash((id(self.cookbook), self._index))
+
+    def __repr__(self):
+        return self.__str__()
+
+class MappedIngredient(_Mapped):
+    # Shopping lists make many of these and only need their names, so every
+    # field is read when it is used.
+    __slots__ = ()
+
+    def __init__(self, cookbook, index):
+        self.cookbook = cookbook
+        self._index = index
+
+    def _field(self, field):
+        cookbook = self.cookbook
+        string, = struct.unpack_from(
+            "<I", cookbook._map, cookbook._ingredients + self._index * binary.INGREDIENT.size + 4 * field)
+        return cookbook._string(string)
+
+    @property
+    def _id(self):
+        return self._field(0)
+
+    @property
+    def name(self):
+        return self._field(1)
+
+    @property
+    def unit(self):
+        return self._field(2)
+
+    @property
+    def calories(self):
+        return self.cookbook._calories(self._index)
+
+    def get_calories(self):
+        return self.calories
+
+    def _flat(self):
+        return {self: one()}
+
+    def get_ingredients(self, amount):
+        return {self: amount}
+
+    def __str__(self):
+        return f"{self.name} ({to_str(self.calories)} kcal/{self.unit})"
+
+class MappedRecipe(_Mapped):
+    __slots__ = ("_id", "name", "category", "_start", "_steps", "_amounts")
+    unit = "serv"
+
+    def __init__(self, cookbook, index):
+        self.cookbook = cookbook
+        self._index = index
+        start = cookbook._record("RECP", index)
+        id_name, name, category, steps, amounts, _ = binary.RECIPE.unpack_from(
+            cookbook._map, start)
+        self._id = cookbook._string(id_name)
+        self.name = cookbook._string(name)
+        self.category = cookbook._string(category)
+        self._start = start + binary.RECIPE.size
+        self._steps = steps
+        self._amounts = amounts
+
+    @property
+    def steps(self):
+        cookbook = self.cookbook
+        return [Step(cookbook._string(description), seconds)
+                for description, _, seconds in cookbook._entries(self._start, self._steps)]
+
+    @property
+    def amounts(self):
+        cookbook = self.cookbook
+        start = self._start + self._steps * binary.ENTRY.size
+        return [[cookbook._component(ref), cookbook._decode(amount)]
+                for ref, _, amount in cookbook._entries(start, self._amounts)]
+
+    def get_seconds(self):
+        return sum(seconds for _, _, seconds
+                   in self.cookbook._entries(self._start, self._steps))
+
+    def get_time(self):
+        return time_string(self.get_seconds())
+
+    def _flat(self):
+        cookbook = self.cookbook
+        number = len(cookbook.ingredients) + self._index
+        return {MappedIngredient(cookbook, ing): share
+                for ing, share in cookbook._shares(number).items()}
+
+    def get_ingredients(self, servings = 1):
+        return {ing: times(amount, servings) for ing, amount in self._flat().items()}
+
+    def get_calories(self, servings = 1):
+        return times(self.cookbook._recipe_calories(self._index), servings)
+
+    def __str__(self):
+        return f"{self.name} ({math.ceil(to_decimal(self.get_calories()))} kcal/serv)"
+
+class MappedMealplan(_Mapped):
+    __slots__ = ("name", "_start", "_lengths")
+
+    def __init__(self, cookbook, index):
+        self.cookbook = cookbook
+        self._index = index
+        start = cookbook._record("PLAN", index)
+        name, days = binary.PLAN.unpack_from(cookbook._map, start)
+        start += binary.PLAN.size
+        self.name = cookbook._string(name)
+        self._lengths = struct.unpack_from(f"<{days}I", cookbook._map, start)
+        self._start = start + 4 * days + binary._pad(4 * days)
+
+    @property
+    def _days(self):
+        cookbook = self.cookbook
+        days = []
+        start = self._start
+        for length in self._lengths:
+            days.append([[cookbook._component(ref), cookbook._decode(amount)]
+                         for ref, _, amount in cookbook._entries(start, length)])
+            start += length * binary.ENTRY.size
+        return days
+
+    def _totals(self):
+        # Unscaled totals by ingredient number, like Mealplan._get_shopping.
+        cookbook = self.cookbook
+        decode = cookbook._decode
+        total = {}
+        count = sum(self._lengths)
+        for ref, _, amount in cookbook._entries(self._start, count):
+            amount = decode(amount)
+            for ing, share in cookbook._shares(ref).items():
+                total[ing] = total.get(ing, 0) + amount * share
+        return {ing: amount for ing, amount in total.items() if amount != 0}
+
+    def _get_shopping(self):
+        return {MappedIngredient(self.cookbook, ing): amount
+                for ing, amount in self._totals().items()}
+
+    def get_shopping_list(self):
+        ls = [[ing.name, total_to_str(amount)]
+              for ing, amount in self._get_shopping().items()]
+        ls.sort(key = lambda entry: entry[0])
+        return ls
+
+    def get_calories(self):
+        if len(self._lengths) == 0:
+            return 0
+        cookbook = self.cookbook
+        calories = 0
+        for ing, amount in self._totals().items():
+            calories += cookbook._calories(ing) * rescale(amount)
+        return math.ceil(to_decimal(rescale(calories)) / len(self._lengths))
+
+    def __str__(self):
+        return self.name
+
+class MappedCookbook():
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        try:
+            self._sections = binary.sections(self._map)
+            for tag in ("STRS", "META", "INGR", "RECP", "PLAN"):
+                if tag not in self._sections:
+                    raise ValueError(f"binary cookbook without {tag} section")
+        except:
+            self._map.close()
+            raise
+        places, _, self._seq = binary.META.unpack_from(self._map, self._sections["META"][0])
+        self._decode = binary.decoder(places)
+        self._decode_share = _share_decoder()
+
+        offset, _ = self._sections["STRS"]
+        count, = binary.COUNT.unpack_from(self._map, offset)
+        self._string_offsets = offset + binary.COUNT.size
+        self._string_data = self._string_offsets + 8 * (count + 1)
+
+        offset, _ = self._sections["INGR"]
+        count, = binary.COUNT.unpack_from(self._map, offset)
+        self._ingredients = offset + binary.COUNT.size
+        self.ingredients = _Records(count, lambda i: MappedIngredient(self, i))
+        count, = binary.COUNT.unpack_from(self._map, self._sections["RECP"][0])
+        self.recipes = _Records(count, lambda i: MappedRecipe(self, i))
+        count, = binary.COUNT.unpack_from(self._map, self._sections["PLAN"][0])
+        self.mealplans = _Records(count, lambda i: MappedMealplan(self, i))
+        # FLAT holds exact shares. In fixed-point mode a loaded cookbook
+        # rounds them at every level of sub-recipes instead, and shopping
+        # lists are only the same if they are expanded here the same way.
+        self._use_flat = "FLAT" in self._sections and fixed_point() == None
+        # Expanded recipes of files without FLAT, or with recipes that did
+        # not fit in it, and calories per serving of recipes in fixed-point
+        # mode.
+        self._flats = {}
+        self._kcal = {}
+        self._ids = None
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_name(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def _string(self, index):
+        start, end = struct.unpack_from("<QQ", self._map, self._string_offsets + 8 * index)
+        return self._map[self._string_data + start:self._string_data + end].decode("utf-8")
+
+    def _record(self, tag, index):
+        offset, _ = self._sections[tag]
+        start, = struct.unpack_from("<Q", self._map, offset + binary.COUNT.size + 8 * index)
+        return offset + start
+
+    def _entries(self, start, count):
+        return binary.ENTRY.iter_unpack(self._map[start:start + count * binary.ENTRY.size])
+
+    def _component(self, number):
+        if number < len(self.ingredients):
+            return MappedIngredient(self, number)
+        return MappedRecipe(self, number - len(self.ingredients))
+
+    def get_component(self, id_name):
+        # Binary search through the ids, or None if there is no such
+        # component.
+        if "IDX " not in self._sections:
+            if self._ids == None:
+                self._ids = {}
+                for i in range(len(self.ingredients) + len(self.recipes)):
+                    self._ids.setdefault(self._component(i)._id, i)
+            number = self._ids.get(id_name)
+            return None if number == None else self._component(number)
+        offset, _ = self._sections["IDX "]
+        low = 0
+        high, = binary.COUNT.unpack_from(self._map, offset)
+        offset += binary.COUNT.size
+        while low < high:
+            middle = (low + high) // 2
+            number, = struct.unpack_from("<I", self._map, offset + 4 * middle)
+            found = self._component_id(number)
+            if found == id_name:
+                return self._component(number)
+            if found < id_name:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _component_id(self, number):
+        if number < len(self.ingredients):
+            start = self._ingredients + number * binary.INGREDIENT.size
+        else:
+            start = self._record("RECP", number - len(self.ingredients))
+        id_name, = struct.unpack_from("<I", self._map, start)
+        return self._string(id_name)
+
+    def _calories(self, ingredient):
+        calories, = struct.unpack_from(
+            "<q", self._map, self._ingredients + ingredient * binary.INGREDIENT.size + 16)
+        return self._decode(calories)
+
+    def _recipe_calories(self, index):
+        # Per serving. In fixed-point mode, from the calories of each
+        # component like Recipe.get_calories, which rounds them at every
+        # level of sub-recipes.
+        if fixed_point() == None:
+            calories = 0
+            for ing, share in self._shares(len(self.ingredients) + index).items():
+                calories += share * self._calories(ing)
+            return calories
+        calories = self._kcal.get(index)
+        if calories == None:
+            calories = 0
+            start = self._record("RECP", index)
+            _, _, _, steps, amounts, _ = binary.RECIPE.unpack_from(self._map, start)
+            start += binary.RECIPE.size + steps * binary.ENTRY.size
+            for ref, _, amount in self._entries(start, amounts):
+                if ref < len(self.ingredients):
+                    component = self._calories(ref)
+                else:
+                    component = self._recipe_calories(ref - len(self.ingredients))
+                calories += self._decode(amount) * component
+            calories = self._kcal[index] = rescale(calories)
+        return calories
+
+    def _shares(self, number):
+        # Ingredients per serving of a component, by ingredient number.
+        if number < len(self.ingredients):
+            return {number: one()}
+        index = number - len(self.ingredients)
+        if self._use_flat:
+            start = self._record("FLAT", index)
+            count, stored = struct.unpack_from("<II", self._map, start)
+            if stored:
+                start += 8
+                decode = self._decode_share
+                return {ing: decode(coefficient, exponent)
+                        for ing, exponent, coefficient in binary.SHARE.iter_unpack(
+                            self._map[start:start + count * binary.SHARE.size])}
+        total = self._flats.get(index)
+        if total == None:
+            total = {}
+            start = self._record("RECP", index)
+            _, _, _, steps, amounts, _ = binary.RECIPE.unpack_from(self._map, start)
+            start += binary.RECIPE.size + steps * binary.ENTRY.size
+            for ref, _, amount in self._entries(start, amounts):
+                amount = self._decode(amount)
+                for ing, share in self._shares(ref).items():
+                    total[ing] = total.get(ing, 0) + mul(amount, share)
+            self._flats[index] = total
+        return total
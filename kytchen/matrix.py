@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import sparse
+
+from .ingredient import Ingredient
+from .amounts import to_decimal
+
+# Whole-cookbook nutrition in a few sparse matrix products instead of one
+# tree walk per recipe. Needs numpy and scipy (pip install kytchen[matrix]).
+# Results are floats, so they are meant for reports and bulk queries; the
+# exact values are still the ones returned by the recipes themselves.
+
+def _levels(cookbook, index):
+    # Length of the longest chain of sub-recipes under every recipe. The
+    # cookbook's dependency order has every sub-recipe before its users.
+    level = [0] * len(index)
+    for recipe in cookbook.recipes_in_order():
+        level[index[recipe]] = 1 + max((level[index[c]] for c, _ in recipe.amounts
+                                        if not isinstance(c, Ingredient)), default = -1)
+    return level
+
+class NutritionMatrix():
+    def __init__(self, cookbook):
+        self.ingredients = list(cookbook.ingredients)
+        self.recipes = list(cookbook.recipes)
+        self._ing_index = {ing: i for i, ing in enumerate(self.ingredients)}
+        self._rec_index = {rec: i for i, rec in enumerate(self.recipes)}
+        n = len(self.ingredients)
+        m = len(self.recipes)
+
+        level = _levels(cookbook, self._rec_index)
+        depth = max(level, default = -1) + 1
+
+        # Direct ingredient amounts, and recipe amounts split by the level of
+        # the recipe that uses them.
+        ing_rows, ing_cols, ing_vals = [], [], []
+        rec_entries = [([], [], []) for _ in range(depth)]
+        for i, recipe in enumerate(self.recipes):
+            for component, amount in recipe.amounts:
+                if isinstance(component, Ingredient):
+                    ing_rows.append(i)
+                    ing_cols.append(self._ing_index[component])
+                    ing_vals.append(float(to_decimal(amount)))
+                else:
+                    rows, cols, vals = rec_entries[level[i]]
+                    rows.append(i)
+                    cols.append(self._rec_index[component])
+                    vals.append(float(to_decimal(amount)))
+
+        # Each level only uses rows of lower levels, which are final by the
+        # time it is added, so one product per level flattens everything.
+        flat = sparse.csr_matrix((ing_vals, (ing_rows, ing_cols)), shape = (m, n))
+        for rows, cols, vals in rec_entries[1:]:
+            uses = sparse.csr_matrix((vals, (rows, cols)), shape = (m, m))
+            flat = flat + uses @ flat
+        self.flat = flat.tocsr()
+        self.update_calories()
+
+    def update_calories(self):
+        # Ingredient calories can change without touching the structure, so
+        # the recipes only need one more product.
+        self.kcal = np.array([float(to_decimal(ing.calories))
+                              for ing in self.ingredients])
+        self.calories = self.flat @ self.kcal
+
+    def recipe_calories(self, recipe, servings = 1):
+        return float(self.calories[self._rec_index[recipe]]) * servings
+
+    def recipe_ingredients(self, recipe, servings = 1):
+        row = self.flat.getrow(self._rec_index[recipe])
+        return {self.ingredients[j]: float(value) * servings
+                for j, value in zip(row.indices, row.data)}
+
+    def mealplan_ingredients(self, mealplan):
+        # Shopping list of a whole plan as a single vector product.
+        weights = np.zeros(len(self.recipes))
+        direct = np.zeros(len(self.ingredients))
+        for day in mealplan._days:
+            for component, amount in day:
+                if isinstance(component, Ingredient):
+                    direct[self._ing_index[component]] += float(to_decimal(amount))
+                else:
+                    weights[self._rec_index[component]] += float(to_decimal(amount))
+        return self.flat.T @ weights + direct
+
+    def mealplan_calories(self, mealplan):
+        if len(mealplan._days) == 0:
+            return 0.0
+        return float(self.mealplan_ingredients(mealplan) @ self.kcal) / len(mealplan._days)
@@ -1,16 +1,21 @@
 import math
-from decimal import Decimal
+from bisect import bisect_left
+from contextlib import contextmanager
 
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtWidgets import (
-    QInputDialog, QWidget, QHBoxLayout, QVBoxLayout, QPushButton,
-    QLabel, QListWidget, QStackedWidget
-)
-from .views import (
-    DashboardTable, DashboardTableModel, CoreTableModel,
-    FixTable, CoreTable, num, Title, no_margin, general_margin
-)
+from .amounts import num, Amounts, rescale, to_decimal, to_str, total_to_str
 
+def _add_totals(total, other, factor = 1):
+    # Adds factor times the amounts in other to total, dropping zeros.
+    for ingredient, amount in other.items():
+        amount = total.get(ingredient, 0) + amount * factor
+        if amount == 0:
+            total.pop(ingredient, None)
+        else:
+            total[ingredient] = amount
+
+def _sort_key(ingredient):
+    # Ingredients with the same name keep a fixed order.
+    return (ingredient.name, ingredient._id)
 
 class Mealplan:
     def __init__(self, cookbook, name = ""):
@@ -19,42 +24,299 @@ class Mealplan:
         self._days = []
         self._shopping_list = {}
         self.window = None
+        # Inside a batch, net amount changes by component that are not in the
+        # shopping list yet.
+        self._batch = 0
+        self._deltas = {}
+        # Segment tree over the days for the shopping lists of a run of days,
+        # built on first use (see _day_sums).
+        self._day_tree = None
+        self._day_positions = None
+        # The shopping list as [name, amount] rows sorted by name, kept up to
+        # date once something asks for it (see shopping_rows), with the sort
+        # key of each row and of each ingredient.
+        self._rows = None
+        self._row_keys = None
+        self._sort_keys = None
+        self._watching = False
+        # Called as watcher(kind, row, done) when a row is inserted or
+        # removed ("insert", "remove"), with done False just before and True
+        # just after. A changed row and dropped rows, which have to be asked
+        # for again, are only reported after: ("change", row, True) and
+        # ("reset", None, True).
+        self.shopping_watchers = []
+        # Calories of the whole shopping list, as the sum of calories times
+        # the rescaled amount of each ingredient, or None until asked for.
+        # Days keep theirs, unscaled, by id of the day, from the calories of
+        # the components they list.
+        self._kcal = None
+        self._day_kcal = {}
 
     def export(self):
         data = {"name": self.name}
         days = []
         for day in self._days:
-            days.append([ [e[0]._id, str(e[1])] for e in day] )
+            days.append([ [e[0]._id, to_str(e[1])] for e in day] )
         data["days"] = days
         return data
 
     @classmethod
     def load(cls, data, cookbook):
         self = cls(cookbook, data["name"])
-        for day in data["days"]:
-            new_day = []
-            for entry in day:
-                self._new_component(new_day, entry[0], entry[1])
+        with self.batch():
+            for day in data["days"]:
+                new_day = Amounts()
+                self._days.append(new_day)
+                for entry in day:
+                    self._new_component(new_day, entry[0], entry[1])
         return self
 
+    @contextmanager
+    def batch(self):
+        # Changes inside only add up how much of each component was added or
+        # removed. The shopping list takes them in when the batch ends, which
+        # expands every component once however often it was touched, and the
+        # cookbook reports the plan once (see Cookbook.batch).
+        with self.cookbook.batch():
+            self._batch += 1
+            try:
+                yield self
+            finally:
+                self._batch -= 1
+                if self._batch == 0:
+                    self._settle()
+
+    def _settle(self):
+        deltas, self._deltas = self._deltas, {}
+        if self._shopping_list == None:
+            # It will be rebuilt from the days, which already have them.
+            return
+        for component, net in deltas.items():
+            if net != 0:
+                self._add_shopping(component, net)
+
+    def _invalidate(self, amounts = True):
+        # Calories have to be added up again if any component changed its
+        # calories, and the shopping list has to be rebuilt if any recipe in
+        # the plan changed its ingredients.
+        self._kcal = None
+        self._day_kcal = {}
+        if amounts:
+            self._shopping_list = None
+            self._day_tree = None
+            self._drop_rows()
+        self.cookbook.notify(self)
+
+    def _get_shopping(self):
+        # In fixed-point mode the totals are kept unscaled (amount times share)
+        # so that adding and removing entries is exact; they are only scaled
+        # back when read.
+        if self._deltas:
+            self._settle()
+        if self._shopping_list == None:
+            total = {}
+            for day in self._days:
+                for component, amount in day:
+                    for ingredient, share in component._flat().items():
+                        total[ingredient] = total.get(ingredient, 0) + amount * share
+            self._shopping_list = {ing: amount for ing, amount in total.items()
+                                   if amount != 0}
+            self._kcal = None
+        return self._shopping_list
+
+    def _day_totals(self, day):
+        total = {}
+        for component, amount in day:
+            _add_totals(total, component._flat(), amount)
+        return total
+
+    def _day_sums(self):
+        # Leaf size + i of the tree holds the unscaled totals of day i, and
+        # every other node the sum of its two children. Any run of days is
+        # then covered by O(log days) nodes that all lie inside it. There is
+        # room for days up to the next power of two.
+        if self._day_tree == None:
+            size = 1
+            while size < len(self._days):
+                size *= 2
+            tree = [{} for _ in range(2 * size)]
+            for i, day in enumerate(self._days):
+                tree[size + i] = self._day_totals(day)
+            for i in range(size - 1, 0, -1):
+                tree[i] = dict(tree[2 * i])
+                _add_totals(tree[i], tree[2 * i + 1])
+            self._day_tree = tree
+            self._day_positions = {id(day): i for i, day in enumerate(self._days)}
+        return self._day_tree
+
+    def _range_totals(self, start, end):
+        start, end, _ = slice(start, end).indices(len(self._days))
+        if start == 0 and end == len(self._days):
+            return self._get_shopping()
+        total = {}
+        if end - start <= 8:
+            # Merging the nodes costs more than a few days of entries.
+            for day in self._days[start:end]:
+                for component, amount in day:
+                    _add_totals(total, component._flat(), amount)
+            return total
+        tree = self._day_sums()
+        size = len(tree) // 2
+        low = start + size
+        high = end + size
+        while low < high:
+            if low & 1:
+                _add_totals(total, tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                _add_totals(total, tree[high])
+            low //= 2
+            high //= 2
+        return total
+
+    def _update_day_sums(self, day_list, component, net):
+        tree = self._day_tree
+        i = len(tree) // 2 + self._day_positions[id(day_list)]
+        flat = component._flat()
+        while i > 0:
+            _add_totals(tree[i], flat, net)
+            i //= 2
+
     def new_day(self):
-        self._days.append([])
+        self._days.append(Amounts())
+        if self._day_tree != None:
+            if len(self._days) > len(self._day_tree) // 2:
+                # Out of room: rebuilt at twice the size when next needed.
+                self._day_tree = None
+            else:
+                # Its leaf is already there, and empty.
+                self._day_positions[id(self._days[-1])] = len(self._days) - 1
+        self.cookbook.changed(self, lambda: {"op": "new_day"})
 
-    def _update_shopping(self, component, increase = Decimal(0), decrease = Decimal(0)):
-        if increase == Decimal(0) and decrease == Decimal(0):
+    def _day_number(self, day_list):
+        # By identity: days with the same entries are equal.
+        for i, day in enumerate(self._days):
+            if day is day_list:
+                return i
+
+    def _entry_edit(self, op, day_list, index):
+        # Journal record of an edit of one entry (see Cookbook.changed),
+        # made after the edit.
+        def edit():
+            record = {"op": op, "day": self._day_number(day_list), "entry": index}
+            if op != "delete_entry":
+                component, amount = day_list[index]
+                record["data"] = [component._id, to_str(amount)]
+            return record
+        return edit
+
+    def _update_shopping(self, component, increase = 0, decrease = 0, day_list = None):
+        if increase == 0 and decrease == 0:
             return
         net = increase - decrease
-        changes = component.get_ingredients(net)
-        for ingredient, amount in changes.items():
-            self._update_ingredient_shopping(ingredient, amount)
+        if day_list == None:
+            self._day_kcal = {}
+        elif id(day_list) in self._day_kcal:
+            self._day_kcal[id(day_list)] += net * component.get_calories()
+        if self._day_tree != None:
+            if self._batch or day_list == None:
+                self._day_tree = None
+            else:
+                self._update_day_sums(day_list, component, net)
+        if self._shopping_list == None:
+            return
+        if self._batch:
+            self._deltas[component] = self._deltas.get(component, 0) + net
+            # The deltas are taken in with the calories of the time they are
+            # settled, which a component that has left the plan may no longer
+            # report, so the total is added up again instead.
+            self._kcal = None
+            return
+        self._add_shopping(component, net)
+
+    def _add_shopping(self, component, net):
+        for ingredient, share in component._flat().items():
+            self._update_ingredient_shopping(ingredient, net * share)
         
     def _update_ingredient_shopping(self, ingredient, net):
-        self._shopping_list.setdefault(ingredient, Decimal(0))
-        self._shopping_list[ingredient] += net
-        if self._shopping_list[ingredient] == 0:
-            del self._shopping_list[ingredient]
+        shopping = self._shopping_list
+        old = shopping.get(ingredient, 0)
+        amount = old + net
+        if amount == 0:
+            shopping.pop(ingredient, None)
+        else:
+            shopping[ingredient] = amount
+        if self._kcal != None:
+            # The same as adding up every ingredient again, even when the
+            # amounts are rounded by rescale.
+            self._kcal += ingredient.get_calories() * (rescale(amount) - rescale(old))
+        if self._rows == None or old == amount:
+            return
+        if old == 0:
+            self._insert_row(ingredient, amount)
+        elif amount == 0:
+            self._remove_row(ingredient)
+        else:
+            row = bisect_left(self._row_keys, self._sort_keys[ingredient])
+            self._rows[row][1] = total_to_str(amount)
+            self._row_event("change", row, True)
+
+    def shopping_rows(self):
+        # Sorted once, then rows are inserted and removed by bisection as
+        # the amounts change, so the list is never sorted again until the
+        # shopping list itself has to be rebuilt. Changes waiting in a batch
+        # are taken in first, like _get_shopping does.
+        if self._deltas:
+            self._settle()
+        if self._rows == None:
+            shopping = self._get_shopping()
+            keyed = sorted((_sort_key(ing), ing) for ing in shopping)
+            self._sort_keys = {ing: key for key, ing in keyed}
+            self._row_keys = [key for key, _ in keyed]
+            self._rows = [[ing.name, total_to_str(shopping[ing])] for _, ing in keyed]
+            if not self._watching:
+                # Renamed ingredients have to move.
+                self.cookbook.watchers.append(self._resort)
+                self._watching = True
+        return self._rows
+
+    def _insert_row(self, ingredient, amount):
+        key = _sort_key(ingredient)
+        row = bisect_left(self._row_keys, key)
+        self._sort_keys[ingredient] = key
+        self._row_event("insert", row, False)
+        self._row_keys.insert(row, key)
+        self._rows.insert(row, [ingredient.name, total_to_str(amount)])
+        self._row_event("insert", row, True)
+
+    def _remove_row(self, ingredient):
+        row = bisect_left(self._row_keys, self._sort_keys.pop(ingredient))
+        self._row_event("remove", row, False)
+        del self._row_keys[row]
+        del self._rows[row]
+        self._row_event("remove", row, True)
+
+    def _resort(self, obj):
+        if self._rows == None or obj not in self._sort_keys:
+            return
+        if self._sort_keys[obj] != _sort_key(obj):
+            self._remove_row(obj)
+            self._insert_row(obj, self._shopping_list[obj])
+
+    def _drop_rows(self):
+        if self._rows == None:
+            return
+        self._rows = None
+        self._row_keys = None
+        self._sort_keys = None
+        self._row_event("reset", None, True)
+
+    def _row_event(self, kind, row, done):
+        for watcher in self.shopping_watchers:
+            watcher(kind, row, done)
 
-    def _new_component(self, day_list, component_id, amount = Decimal(0), strict = False):
+    def _new_component(self, day_list, component_id, amount = 0, strict = False):
         try:
             amount = num(amount)
         except:
@@ -64,13 +326,16 @@ class Mealplan:
         component = self.cookbook.link_component(self, component_id)
         if component != None:
             day_list.append([component, amount])
-            self._update_shopping(component, increase = amount)
+            self._update_shopping(component, increase = amount, day_list = day_list)
+            self.cookbook.changed(self, self._entry_edit("insert_entry", day_list,
+                                                         len(day_list) - 1))
 
     def _remove_component(self, day_list, index):
-        component, amount = self.day_list[index]
+        component, amount = day_list[index]
         self.cookbook.unlink_component(self, component)
-        self._update_shopping(component, decrease = amount)
-        del self.day_list[index]
+        self._update_shopping(component, decrease = amount, day_list = day_list)
+        del day_list[index]
+        self.cookbook.changed(self, self._entry_edit("delete_entry", day_list, index))
 
     def _change_amount(self, day_list, index, new_amount, strict = False):
         component, old_amount = day_list[index]
@@ -80,8 +345,10 @@ class Mealplan:
             if strict:
                 raise ValueError("invalid amount")
             return False
-        self._update_shopping(component, increase = new_amount, decrease = old_amount)
+        self._update_shopping(component, increase = new_amount, decrease = old_amount,
+                              day_list = day_list)
         day_list[index][1] = new_amount
+        self.cookbook.changed(self, self._entry_edit("set_entry", day_list, index))
         return True
 
     def _change_component(self, day_list, index, new_id):
@@ -90,54 +357,72 @@ class Mealplan:
         if new_component == None:
             return
         self.cookbook.unlink_component(self, old_component)
-        self._update_shopping(old_component, decrease = amount)
-        self._update_shopping(new_component, decrease = amount)
+        self._update_shopping(old_component, decrease = amount, day_list = day_list)
+        self._update_shopping(new_component, increase = amount, day_list = day_list)
         day_list[index][0] = new_component
+        self.cookbook.changed(self, self._entry_edit("set_entry", day_list, index))
 
     def remove_day(self, day):
         ls = self._days[day]
-        for i in range(len(ls)):
-            self.remove_component(ls, 0)
-        del self._days[day]
-
-    def get_shopping_list(self):
+        with self.batch():
+            for i in range(len(ls)):
+                self._remove_component(ls, 0)
+            del self._days[day]
+            self._day_tree = None
+            self._day_kcal.pop(id(ls), None)
+            self.cookbook.changed(self, lambda: {"op": "delete_day", "day": day})
+
+    def get_shopping_list(self, start = 0, end = None):
+        # start and end pick a run of days like a slice of them.
+        if slice(start, end).indices(len(self._days))[:2] == (0, len(self._days)):
+            return [list(row) for row in self.shopping_rows()]
         ls = []
-        for component, amount in self._shopping_list.items():
-            ls.append([component.name, str(amount)])
+        for component, amount in self._range_totals(start, end).items():
+            ls.append([component.name, total_to_str(amount)])
         ls.sort(key = lambda entry: entry[0])
         return ls
 
-    def get_calories(self):
-        calories = Decimal(0)
-        if len(self._days) == 0:
+    def get_calories(self, start = 0, end = None):
+        # Average over the days from start to end, like a slice of them.
+        calories = 0
+        start, end, _ = slice(start, end).indices(len(self._days))
+        if end <= start:
             return calories
-        for element, amount in self._shopping_list.items():
-            calories += element.get_calories() * amount
-         
-        return math.ceil(calories / len(self._days))
+        if start == 0 and end == len(self._days):
+            shopping = self._get_shopping()
+            if self._kcal == None:
+                self._kcal = sum((element.get_calories() * rescale(amount)
+                                  for element, amount in shopping.items()), 0)
+            calories = self._kcal
+        else:
+            for element, amount in self._range_totals(start, end).items():
+                calories += element.get_calories() * rescale(amount)
+        return math.ceil(to_decimal(rescale(calories)) / (end - start))
+
+    def get_day_calories(self, day):
+        # Calories of one day, kept up to date as it changes.
+        day_list = self._days[day]
+        calories = self._day_kcal.get(id(day_list))
+        if calories == None:
+            calories = sum((amount * component.get_calories()
+                            for component, amount in day_list), 0)
+            self._day_kcal[id(day_list)] = calories
+        return math.ceil(to_decimal(rescale(calories)))
 
     def __str__(self):
-        string = self.name
-        string += "\n\n"
-        for i, day in enumerate(self._days):
-            string += f"DAY {i + 1}"
-            for item, amount in day:
-                string += f"\n- {item.name} ({amount} {item.unit})"
-        string += f"Average daily energy: {self.get_calories()} kcal\n"
-        return string
+        from .render import mealplan_parts, render
+        return render(mealplan_parts(self))
 
     def __repr__(self):
         return self.name
 
     def str_shopping_list(self):
-        string = "";
-        ingredients = self.get_ingredients()
-        for ing in ingredients:
-            string += f"{ing.name}: {ingredients[ing]} {ing.unit}\n"
-        return string
+        from .render import render, shopping_list_parts
+        return render(shopping_list_parts(self))
 
     def get_window(self):
         if self.window == None:
+            from .mealplan_views import MealplanView
             self.window = MealplanView(self, self.cookbook.window)
         self.window.set_editing(False)
         self.window.show()
@@ -145,8 +430,12 @@ class Mealplan:
     def _clear(self):
         if self.window != None:
             self.window.deleteLater()
-        for i in range(len(self._days)):
-            self.remove_day()
+        with self.batch():
+            for i in range(len(self._days)):
+                self.remove_day(0)
+        if self._watching:
+            self.cookbook.watchers.remove(self._resort)
+            self._watching = False
 
     def _col(self, col):
         if col == 0:
@@ -155,231 +444,3 @@ class Mealplan:
             return str(self.get_calories())
         else:
             return None
-
-class MealplanDashModel(DashboardTableModel):
-    header_names = ["Meal plan name", "kcal/day", ""]
-    align = ["left", "", ""]
-    not_editable = [1,2]
-
-    def __init__(self, parent, cookbook):
-        self.cookbook = cookbook
-        super().__init__(parent, cookbook.mealplans)
-
-    def get_data(self, row, col):
-        recipe = self.content[row]
-        return recipe._col(col)
-
-    def set_data(self, row, col, value):
-        mealplan = self.content[row]
-        if col == 0:
-            mealplan.name = value
-            if mealplan.window != None:
-                mealplan.window.refresh_name()
-        return True       
-
-    def new_entry(self):
-        mealplan = Mealplan(self.cookbook) 
-        self.cookbook.register_mealplan(mealplan)
-    
-    def delete_entry(self, row):
-        self.cookbook.delete_mealplan(row) 
-
- 
-class MealplanDashTable(DashboardTable):
-    ModelClass = MealplanDashModel 
-    item_name = "meal plan"
-    stretch_widths = [0]
-
-class MealplanView(QWidget):
-    def __init__(self, mealplan, parent):
-        super().__init__(parent = parent)
-        self.setWindowFlag(Qt.WindowType.Window)
-        self.resize(600, 700)
-        self.mealplan = mealplan
-
-        self.layout = QVBoxLayout()
-        self.setLayout(self.layout)
-        no_margin(self.layout)
-        self.layout.setSpacing(0)
-
-        name = self.mealplan.name
-        if name == "":
-            name = "Untitled meal plan"
-
-        hbox = QHBoxLayout()
-        general_margin(hbox)
-        self.name_label = Title(f"")
-        self.kcal_label = Title("")
-        hbox.addWidget(self.name_label)
-        hbox.addStretch(1)
-        hbox.addWidget(self.kcal_label)
-        self.layout.addLayout(hbox)
-
-        self.refresh_name()
-
-        self.shopping_view = ShoppingListTable(self.mealplan.get_shopping_list())
-        self.main_layout = QHBoxLayout()
-        self.layout.addLayout(self.main_layout)
-        self.sidebar_container = QVBoxLayout()
-        self.sidebar = QListWidget()
-        self.sidebar.setMaximumWidth(120)
-        self.sidebar_container.addWidget(self.sidebar)
-        self.sidebar.currentRowChanged.connect(self.menu_action)
-        self.sidebar_buttons_widget = QWidget()
-        self.sidebar_buttons = QHBoxLayout(self.sidebar_buttons_widget)
-        no_margin(self.sidebar_buttons)
-        self.sidebar_buttons.setSpacing(0)
-        self.sidebar_container.addWidget(self.sidebar_buttons_widget)
-        self.button_add = QPushButton("+")
-        self.button_remove = QPushButton("-")
-        self.button_add.setMaximumWidth(40)
-        self.button_remove.setMaximumWidth(40)
-        self.button_add.clicked.connect(self.new_day)
-        self.button_remove.clicked.connect(self.remove_day)
-        self.sidebar_buttons.addWidget(
-            self.button_remove,alignment=Qt.AlignmentFlag.AlignRight)
-        self.sidebar_buttons.addWidget(
-            self.button_add, alignment=Qt.AlignmentFlag.AlignRight)
-
-        self.stack = QStackedWidget()
-        self.main_layout.addLayout(self.sidebar_container)
-        self.main_layout.addWidget(self.stack)
-
-        self.sidebar.addItems(["Shopping list"])
-        self.stack.addWidget(self.shopping_view)
-        self.views = []
-        for i in range(len(self.mealplan._days)):
-            self.sidebar.addItem(f"Day {i + 1}")
-            view = MealplanDayTable(self.mealplan, i)
-            self.views.append(view)
-            self.stack.addWidget(view)
-            view.model.refresh.connect(self.refresh)
-
-
-        self.controls = QHBoxLayout()
-        general_margin(self.controls)
-        self.edit_button = QPushButton("")
-        self.edit_button.clicked.connect(self.toggle_edit)
-        self.set_editing(False)
-
-        self.controls.addStretch()
-        self.controls.addWidget(self.edit_button)
-
-        self.layout.addLayout(self.controls)
-        self.refresh()
-
-    def menu_action(self, index):
-        if index == 0:
-            self.shopping_view.model.beginResetModel()
-            self.shopping_view.model.content = self.mealplan.get_shopping_list()
-            self.shopping_view.model.endResetModel()
-        self.stack.setCurrentIndex(index)
-
-    def new_day(self):
-        self.mealplan.new_day()
-        day = len(self.mealplan._days)
-        self.sidebar.addItem(f"Day {day}")
-        view = MealplanDayTable(self.mealplan, day - 1)
-        view.set_editable(self.editing)
-        self.views.append(view)
-        view.model.refresh.connect(self.refresh)
-        self.stack.addWidget(view)
-
-    def remove_day(self):
-        if len(self.mealplan._days) == 0:
-            return
-        last = len(self.mealplan._days) - 1
-        label = self.sidebar.takeItem(last + 1)
-        del label
-        view = self.views.pop()
-        self.stack.removeWidget(view)
-        view.deleteLater()
-        self.mealplan.remove_day(last)
-
-    def set_editing(self, edit):
-        self.editing = edit
-        if edit:
-            self.edit_button.setText("Save")
-        else:
-            self.edit_button.setText("Edit")
-        for view in self.views:
-            view.set_editable(edit)
-        self.sidebar_buttons_widget.setVisible(edit)
-
-    def toggle_edit(self):
-        self.set_editing(not self.editing)
-
-    def refresh(self):
-        self.kcal_label.setText(f"{self.mealplan.get_calories()} kcal/day")
-
-    def refresh_name(self):
-        self.setWindowTitle(f"Meal plan '{self.mealplan.name}'")
-        self.name_label.setText(self.mealplan.name)
-
-class MealplanDayModel(CoreTableModel):
-    header_names = ["Meal", "Amount"]
-    align = ["right", ""]
-    refresh = pyqtSignal()
-
-    def __init__(self, parent, content):
-        self.mealplan, day = content
-        super().__init__(parent, self.mealplan._days[day])
-
-    def deep_data(self, row, col, is_display):
-        ing, amount = self.content[row]
-        if col == 0:
-            if is_display:
-                return ing.name
-            else:
-                return ing._id
-        elif col == 1:
-            if is_display:
-                return f"{amount} {ing.unit}"
-            else:
-                return str(amount)
-   
-    def set_data(self, row, col, value):
-        comp, _ = self.content[row]
-        if col == 0:
-            self.mealplan._change_component(self.content, row, value)
-        elif col == 1:
-            self.mealplan._change_amount(self.content, row, value) 
-        else:
-            return False
-
-        self.refresh.emit()
-        return True
-
-    def new_entry(self):
-        new_id, ok = QInputDialog.getText(self.parent(), "New meal",
-            "Please specify the name of an ingredient or recipe:")
-        self.mealplan._new_component(self.content, new_id)
-
-    def delete_entry(self, row):
-        self._remove_component(self.content, row)
-
-class MealplanDayTable(FixTable):
-    ModelClass = MealplanDayModel
-    item_name = "meal"
-    default_widths = [(1,100),]
-    fixed_widths = [1]
-    stretch_widths = [0]
-
-    def __init__(self, mealplan, day):
-        super().__init__((mealplan, day))
-
-
-class ShoppingListModel(CoreTableModel):
-    header_names = ["Ingredient", "Amount"]
-    align = ["right", ""]
-    not_editable = [0, 1]
-    
-    def get_data(self, row, col):
-        return self.content[row][col]
-
-class ShoppingListTable(CoreTable):
-    ModelClass = ShoppingListModel
-    item_name = None
-    default_widths = [(1,100),]
-    fixed_widths = [1]
-    stretch_widths = [0]
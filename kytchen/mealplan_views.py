@@ -0,0 +1,291 @@
+from PyQt6.QtCore import Qt, pyqtSignal, QModelIndex, QTimer
+from PyQt6.QtWidgets import (
+    QInputDialog, QWidget, QHBoxLayout, QVBoxLayout, QPushButton,
+    QListWidget, QStackedWidget
+)
+from .views import (
+    DashboardTable, DashboardTableModel, CoreTableModel,
+    FixTable, CoreTable, Title, no_margin, general_margin
+)
+from .mealplan import Mealplan
+from .amounts import to_str
+
+
+class MealplanDashModel(DashboardTableModel):
+    header_names = ["Meal plan name", "kcal/day", ""]
+    align = ["left", "", ""]
+    not_editable = [1,2]
+
+    def __init__(self, parent, cookbook):
+        self.cookbook = cookbook
+        super().__init__(parent, cookbook.mealplans, cookbook)
+
+    def get_data(self, row, col):
+        recipe = self.content[row]
+        return recipe._col(col)
+
+    def set_data(self, row, col, value):
+        mealplan = self.content[row]
+        if col == 0:
+            mealplan.name = value
+            if mealplan.window != None:
+                mealplan.window.refresh_name()
+            self.cookbook.changed(mealplan)
+        return True       
+
+    def new_entry(self):
+        mealplan = Mealplan(self.cookbook) 
+        self.cookbook.register_mealplan(mealplan)
+    
+    def delete_entry(self, row):
+        self.cookbook.delete_mealplan(row) 
+
+ 
+class MealplanDashTable(DashboardTable):
+    ModelClass = MealplanDashModel 
+    item_name = "meal plan"
+    stretch_widths = [0]
+
+class MealplanView(QWidget):
+    def __init__(self, mealplan, parent):
+        super().__init__(parent = parent)
+        self.setWindowFlag(Qt.WindowType.Window)
+        self.resize(600, 700)
+        self.mealplan = mealplan
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+        no_margin(self.layout)
+        self.layout.setSpacing(0)
+
+        name = self.mealplan.name
+        if name == "":
+            name = "Untitled meal plan"
+
+        hbox = QHBoxLayout()
+        general_margin(hbox)
+        self.name_label = Title("")
+        self.kcal_label = Title("")
+        hbox.addWidget(self.name_label)
+        hbox.addStretch(1)
+        hbox.addWidget(self.kcal_label)
+        self.layout.addLayout(hbox)
+
+        self.refresh_name()
+
+        self.shopping_view = ShoppingListTable(self.mealplan)
+        self.main_layout = QHBoxLayout()
+        self.layout.addLayout(self.main_layout)
+        self.sidebar_container = QVBoxLayout()
+        self.sidebar = QListWidget()
+        self.sidebar.setMaximumWidth(120)
+        self.sidebar_container.addWidget(self.sidebar)
+        self.sidebar.currentRowChanged.connect(self.menu_action)
+        self.sidebar_buttons_widget = QWidget()
+        self.sidebar_buttons = QHBoxLayout(self.sidebar_buttons_widget)
+        no_margin(self.sidebar_buttons)
+        self.sidebar_buttons.setSpacing(0)
+        self.sidebar_container.addWidget(self.sidebar_buttons_widget)
+        self.button_add = QPushButton("+")
+        self.button_remove = QPushButton("-")
+        self.button_add.setMaximumWidth(40)
+        self.button_remove.setMaximumWidth(40)
+        self.button_add.clicked.connect(self.new_day)
+        self.button_remove.clicked.connect(self.remove_day)
+        self.sidebar_buttons.addWidget(
+            self.button_remove,alignment=Qt.AlignmentFlag.AlignRight)
+        self.sidebar_buttons.addWidget(
+            self.button_add, alignment=Qt.AlignmentFlag.AlignRight)
+
+        self.stack = QStackedWidget()
+        self.main_layout.addLayout(self.sidebar_container)
+        self.main_layout.addWidget(self.stack)
+
+        self.sidebar.addItems(["Shopping list"])
+        self.stack.addWidget(self.shopping_view)
+        self.views = []
+        for i in range(len(self.mealplan._days)):
+            self.sidebar.addItem(f"Day {i + 1}")
+            view = MealplanDayTable(self.mealplan, i)
+            self.views.append(view)
+            self.stack.addWidget(view)
+            view.model.refresh.connect(self.refresh)
+
+
+        self.controls = QHBoxLayout()
+        general_margin(self.controls)
+        self.edit_button = QPushButton("")
+        self.edit_button.clicked.connect(self.toggle_edit)
+        self.set_editing(False)
+
+        self.controls.addStretch()
+        self.controls.addWidget(self.edit_button)
+
+        self.layout.addLayout(self.controls)
+        self.refresh()
+
+    def menu_action(self, index):
+        self.stack.setCurrentIndex(index)
+        self.refresh()
+
+    def new_day(self):
+        self.mealplan.new_day()
+        day = len(self.mealplan._days)
+        self.sidebar.addItem(f"Day {day}")
+        view = MealplanDayTable(self.mealplan, day - 1)
+        view.set_editable(self.editing)
+        self.views.append(view)
+        view.model.refresh.connect(self.refresh)
+        self.stack.addWidget(view)
+
+    def remove_day(self):
+        if len(self.mealplan._days) == 0:
+            return
+        last = len(self.mealplan._days) - 1
+        label = self.sidebar.takeItem(last + 1)
+        del label
+        view = self.views.pop()
+        self.stack.removeWidget(view)
+        view.deleteLater()
+        self.mealplan.remove_day(last)
+
+    def set_editing(self, edit):
+        self.editing = edit
+        if edit:
+            self.edit_button.setText("Save")
+        else:
+            self.edit_button.setText("Edit")
+        for view in self.views:
+            view.set_editable(edit)
+        self.sidebar_buttons_widget.setVisible(edit)
+
+    def toggle_edit(self):
+        self.set_editing(not self.editing)
+
+    def refresh(self):
+        text = f"{self.mealplan.get_calories()} kcal/day"
+        day = self.stack.currentIndex() - 1
+        if 0 <= day < len(self.mealplan._days):
+            text = f"{self.mealplan.get_day_calories(day)} kcal ({text})"
+        self.kcal_label.setText(text)
+
+    def refresh_name(self):
+        self.setWindowTitle(f"Meal plan '{self.mealplan.name}'")
+        self.name_label.setText(self.mealplan.name)
+
+class MealplanDayModel(CoreTableModel):
+    header_names = ["Meal", "Amount"]
+    align = ["right", ""]
+    refresh = pyqtSignal()
+
+    def __init__(self, parent, content):
+        self.mealplan, day = content
+        super().__init__(parent, self.mealplan._days[day])
+
+    def deep_data(self, row, col, is_display):
+        ing, amount = self.content[row]
+        if col == 0:
+            if is_display:
+                return ing.name
+            else:
+                return ing._id
+        elif col == 1:
+            if is_display:
+                return f"{to_str(amount)} {ing.unit}"
+            else:
+                return to_str(amount)
+   
+    def set_data(self, row, col, value):
+        comp, _ = self.content[row]
+        if col == 0:
+            self.mealplan._change_component(self.content, row, value)
+        elif col == 1:
+            self.mealplan._change_amount(self.content, row, value) 
+        else:
+            return False
+
+        self.refresh.emit()
+        return True
+
+    def new_entry(self):
+        new_id, ok = QInputDialog.getText(self.parent(), "New meal",
+            "Please specify the name of an ingredient or recipe:")
+        self.mealplan._new_component(self.content, new_id)
+        self.refresh.emit()
+
+    def delete_entry(self, row):
+        self.mealplan._remove_component(self.content, row)
+        self.refresh.emit()
+
+    def rows_moved(self):
+        self.mealplan.cookbook.changed(self.mealplan)
+
+class MealplanDayTable(FixTable):
+    ModelClass = MealplanDayModel
+    item_name = "meal"
+    default_widths = [(1,100),]
+    fixed_widths = [1]
+    stretch_widths = [0]
+
+    def __init__(self, mealplan, day):
+        super().__init__((mealplan, day))
+
+
+class ShoppingListModel(CoreTableModel):
+    header_names = ["Ingredient", "Amount"]
+    align = ["right", ""]
+    not_editable = [0, 1]
+
+    def __init__(self, parent, mealplan):
+        # The rows are the meal plan's own sorted shopping list, which it
+        # keeps up to date and reports row by row.
+        self.mealplan = mealplan
+        self._reload_pending = False
+        super().__init__(parent, mealplan.shopping_rows())
+        watcher = self.shopping_changed
+        mealplan.shopping_watchers.append(watcher)
+        self.destroyed.connect(lambda: mealplan.shopping_watchers.remove(watcher)
+                               if watcher in mealplan.shopping_watchers else None)
+
+    def get_data(self, row, col):
+        return self.content[row][col]
+
+    def shopping_changed(self, kind, row, done):
+        if kind == "reset":
+            # Rebuilt once control gets back to the event loop, however many
+            # times it was dropped meanwhile. The old rows are left alone
+            # until then.
+            if not self._reload_pending:
+                self._reload_pending = True
+                QTimer.singleShot(0, self.reload)
+            return
+        if self.content is not self.mealplan._rows:
+            # A reload is on its way.
+            return
+        if kind == "insert":
+            if not done:
+                self.beginInsertRows(QModelIndex(), row, row)
+            else:
+                self.loaded += 1
+                self.endInsertRows()
+        elif kind == "remove":
+            if not done:
+                self.beginRemoveRows(QModelIndex(), row, row)
+            else:
+                self.loaded -= 1
+                self.endRemoveRows()
+        else:
+            self.update_row(row)
+
+    def reload(self):
+        self._reload_pending = False
+        self.beginResetModel()
+        self.content = self.mealplan.shopping_rows()
+        self.endResetModel()
+
+class ShoppingListTable(CoreTable):
+    ModelClass = ShoppingListModel
+    item_name = None
+    default_widths = [(1,100),]
+    fixed_widths = [1]
+    stretch_widths = [0]
@@ -1,15 +1,7 @@
 import math
+from collections.abc import MutableSequence
 
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtWidgets import (
-    QInputDialog, QWidget, QHBoxLayout, QVBoxLayout, QPushButton
-)
-from decimal import Decimal
-
-from .views import (
-    DashboardTable, DashboardTableModel, CoreTableModel, FixTable,
-    create_new, num, Title, Subtitle, general_margin, no_margin
-)
+from .amounts import num, Amounts, mul, rescale, times, to_decimal, to_str
 
 
 def time_string(t):
@@ -37,9 +29,24 @@ def parse_time(time):
         raise ValueError("invalid time format")
 
 class Step():
+    __slots__ = ("description", "_seconds", "_steps")
+
     def __init__(self, description, seconds):
         self.description = description
-        self.seconds = seconds
+        self._seconds = seconds
+        self._steps = None
+
+    @property
+    def seconds(self):
+        return self._seconds
+
+    @seconds.setter
+    def seconds(self, value):
+        self._seconds = value
+        # Setting it directly does not know the position of the step, so the
+        # running times are rebuilt the next time they are read.
+        if self._steps != None:
+            self._steps._tree = None
     
     def __str__(self):
         if self.seconds != math.nan:
@@ -47,8 +54,107 @@ class Step():
         else:
             return self.description
 
+class Steps(MutableSequence):
+    # The steps of a recipe, with their running times in a Fenwick tree, so
+    # that the end time of any step takes O(log n) and the total O(1).
+    __slots__ = ("_steps", "_tree", "_total")
+
+    def __init__(self, steps = ()):
+        self._steps = []
+        self._tree = None
+        self._total = 0
+        for step in steps:
+            self.append(step)
+
+    def _build(self):
+        n = len(self._steps)
+        tree = [0] * (n + 1)
+        for i, step in enumerate(self._steps, 1):
+            tree[i] += step.seconds
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+        self._total = self._prefix(n)
+
+    def _prefix(self, count):
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def _add(self, index, delta):
+        tree = self._tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+        self._total += delta
+
+    def elapsed(self, index):
+        # Seconds from the start until the end of the step at this index.
+        if self._tree == None:
+            self._build()
+        if index < 0:
+            index += len(self._steps)
+        return self._prefix(index + 1)
+
+    def total(self):
+        if self._tree == None:
+            self._build()
+        return self._total
+
+    def set_seconds(self, index, seconds):
+        step = self._steps[index]
+        if self._tree != None:
+            self._add(index % len(self._steps), seconds - step._seconds)
+        step._seconds = seconds
+
+    def __len__(self):
+        return len(self._steps)
+
+    def __getitem__(self, index):
+        return self._steps[index]
+
+    def __setitem__(self, index, step):
+        if isinstance(index, slice):
+            raise TypeError("steps do not support slice assignment")
+        old = self._steps[index]
+        step._steps = self
+        self._steps[index] = step
+        if self._tree != None:
+            self._add(index % len(self._steps), step.seconds - old.seconds)
+
+    def __delitem__(self, index):
+        del self._steps[index]
+        self._tree = None
+
+    def insert(self, index, step):
+        step._steps = self
+        if index >= len(self._steps) and self._tree != None:
+            # Appending only needs the new node: the steps it covers are
+            # already summed in the nodes below it.
+            self._steps.append(step)
+            i = len(self._steps)
+            low = i - (i & -i)
+            self._tree.append(self._prefix(i - 1) - self._prefix(low) + step.seconds)
+            self._total += step.seconds
+            return
+        self._steps.insert(index, step)
+        self._tree = None
+
+    def __iter__(self):
+        return iter(self._steps)
+
+    def __repr__(self):
+        return repr(self._steps)
+
 class Recipe:
     unit = "serv"
+    __slots__ = ("name", "_steps", "category", "cookbook", "amounts", "_id",
+                 "_used", "_calories", "_ingredients", "_order", "window")
+
     def __init__(self, id_name, cookbook, name = "", category = "", steps = None):
         self.name = name
         if steps == None:
@@ -57,11 +163,23 @@ class Recipe:
         self.category = category
 
         self.cookbook = cookbook
-        self.amounts = []
+        self.amounts = Amounts()
         self._id = id_name
         self._used = {}
+        self._calories = None
+        self._ingredients = None
+        # Position in the cookbook's dependency order, set on first link.
+        self._order = None
         self.window = None
 
+    @property
+    def steps(self):
+        return self._steps
+
+    @steps.setter
+    def steps(self, steps):
+        self._steps = Steps(steps)
+
     def export(self):
         data = {"name": self.name, "category": self.category, "id": self._id}
         steps = []
@@ -69,7 +187,7 @@ class Recipe:
             steps.append([step.description, step.seconds]) 
         amounts = []
         for component, amount in self.amounts:
-            amounts.append([component._id, str(amount)])
+            amounts.append([component._id, to_str(amount)])
 
         data["steps"] = steps
         data["amounts"] = amounts
@@ -78,13 +196,17 @@ class Recipe:
 
     @classmethod
     def load_steps(cls, data, cookbook):
-        id_name = data["id"]
-        name = data["name"]
-        category = data["category"]
+        self = cls(data["id"], cookbook)
+        self.fill_steps(data)
+        return self
+
+    def fill_steps(self, data):
+        self.name = data["name"]
+        self.category = data["category"]
         steps = []
         for step in data["steps"]:
             steps.append(Step(step[0], step[1]))
-        return cls(id_name, cookbook, name, category, steps)
+        self.steps = steps
     
     def load_amounts(self, data):
         data = data["amounts"]
@@ -92,6 +214,15 @@ class Recipe:
             self.new_component(entry[0], entry[1], True)
 
     def change_amounts(self, index, component = None, amount = None, strict = False):
+        # The amount is checked first, so that a bad one leaves the entry as
+        # it was instead of half changed.
+        if amount != None:
+            try:
+                value = num(amount)
+            except (ValueError, ArithmeticError):
+                if strict:
+                    raise ValueError("invalid amount")
+                return False
         if component != None:
             ing, _ = self.amounts[index]
             new = self.cookbook.change_link(self, ing, component)
@@ -100,75 +231,86 @@ class Recipe:
                     raise ValueError("invalid component ID")
                 return False
             self.amounts[index][0] = new
+            self._invalidate()
         if amount != None:
-            try:
-                value = num(amount)
-            except:
-                if strict:
-                    raise ValueError("invalid amount")
-                return False
             self.amounts[index][1] = value 
+            self._invalidate()
+        self.cookbook.changed(self, self._entry_edit("set_entry", index))
         return True
 
-    def new_component(self, id_name, amount = Decimal(0), strict = False):
+    def new_component(self, id_name, amount = 0, strict = False):
         new = self.cookbook.link_component(self, id_name)
         if new != None:
             self.amounts.append([new, num(amount)])
+            self._invalidate()
+            self.cookbook.changed(self, self._entry_edit("insert_entry", len(self.amounts) - 1))
             return True
         elif strict:
             raise ValueError("invalid component ID")
         else:
             return False
 
+    def remove_component(self, index):
+        component, _ = self.amounts[index]
+        self.cookbook.unlink_component(self, component)
+        del self.amounts[index]
+        self._invalidate()
+        self.cookbook.changed(self, self._entry_edit("delete_entry", index))
+
+    def _entry_edit(self, op, index):
+        # Journal record of an edit of one amount (see Cookbook.changed),
+        # made after the edit.
+        def edit():
+            record = {"op": op, "entry": index}
+            if op != "delete_entry":
+                component, amount = self.amounts[index]
+                record["data"] = [component._id, to_str(amount)]
+            return record
+        return edit
+
     def get_amounts(self, servings = 1):
         amounts = []
         for (component, amount) in self.amounts:
-            amounts.append((component, amount * servings))
+            amounts.append((component, times(amount, servings)))
         return amounts
 
     def get_calories(self, servings = 1):
-        calories = 0
-        amounts = self.get_amounts(servings)
-        for (component, amount) in amounts:
-            calories += amount * component.get_calories()
-        return calories
+        if self._calories == None:
+            calories = 0
+            for (component, amount) in self.amounts:
+                calories += amount * component.get_calories()
+            self._calories = rescale(calories)
+        return times(self._calories, servings)
+
+    def _invalidate(self, amounts = True):
+        # If the caches are already empty, so are the caches of everything
+        # that uses this recipe: they could not have been filled without
+        # them. Meal plans add up calories from the expanded ingredients, so
+        # those count even when only calories changed.
+        if self._calories == None and self._ingredients == None:
+            return
+        self._calories = None
+        if amounts:
+            self._ingredients = None
+        self.cookbook.notify(self)
+        for user in list(self._used):
+            user._invalidate(amounts)
 
     def get_seconds(self):
-        total_seconds = 0
-        for step in self.steps:
-            total_seconds += step.seconds
-        return total_seconds
+        return self.steps.total()
 
     def get_time(self):
         return time_string(self.get_seconds())
 
     def recipe_string(self, servings = 1):
-        string = self.name
-        string += f"""
-Servings: {servings}
-Calories: {math.ceil(self.get_calories(servings))} kcal
-"""
-        time = time_string(self.get_seconds())
-        string += f"Preparation time: {time}\n"
-
-        string += "\nINGREDIENTS\n"
-        amounts = self.get_amounts(servings)
-        for ingredient, amount in amounts:
-            string += f"{amount} {ingredient.unit}  {ingredient.name}\n"
-
-        string += "\nMETHOD"
-        tot_seconds = 0
-        for step in self.steps:
-            string += f"\n- {step.description} ({time_string(step.seconds)})"
-            tot_seconds += step.seconds
-            string += " >{time_string(tot_seconds)}"
-        return string
+        from .render import recipe_parts, render
+        return render(recipe_parts(self, servings))
 
     def __str__(self):
         return self.recipe_string(servings = 1)
     
     def __repr__(self):
-        return f"{self.name} ({math.ceil(self.get_calories(1))} kcal/serv)"
+        return f"{self.name} ({math.ceil(to_decimal(self.get_calories(1)))} kcal/serv)"
 
     def _col(self, col):
         if col == 0:
@@ -178,246 +320,35 @@ Calories: {math.ceil(self.get_calories(servings))} kcal
         elif col == 2:
             return self.category
         elif col == 3:
-            return str(self.get_calories())
+            return to_str(self.get_calories())
         elif col == 4:
             return self.get_time()
         else:
             return None
 
     def get_ingredients(self, servings):
-        total = {}
-        for component, amount in self.amounts:
-            add = component.get_ingredients(amount * servings)
-            for c, a in add:
-                if c in total:
-                    total[c] += a
-                else:
-                    total[c] = a
-        return total
+        return {ing: times(amount, servings) for ing, amount in self._flat().items()}
+
+    def _flat(self):
+        # Ingredients per serving, with every sub-recipe already expanded.
+        # Sub-recipes flatten themselves first, so each one is built once.
+        if self._ingredients == None:
+            total = {}
+            for component, amount in self.amounts:
+                for ing, share in component._flat().items():
+                    add = mul(amount, share)
+                    if ing in total:
+                        total[ing] += add
+                    else:
+                        total[ing] = add
+            self._ingredients = total
+        return self._ingredients
 
     def get_window(self):
         if self.window == None:
+            from .recipe_views import RecipeView
             self.window = RecipeView(self, self.cookbook.window)
         else:
             self.window.refresh()
         self.window.set_editing(False)
         self.window.show()
-
-
-class RecipeDashModel(DashboardTableModel):
-    header_names = ["ID", "Recipe name", "Category", "kcal", "Prep. time", ""]
-    align = ["", "left", "", "", "", "", ""]
-    not_editable = [3, 4, 5]
-
-    def __init__(self, parent, cookbook):
-        self.cookbook = cookbook
-        super().__init__(parent, cookbook.recipes)
-
-    def get_data(self, row, col):
-        recipe = self.content[row]
-        return recipe._col(col)
-
-
-    def set_data(self, row, col, value):
-        recipe = self.content[row]
-        if col == 0:
-            self.cookbook.update_component_id(recipe, value) 
-        elif col == 1:
-            recipe.name = value
-            if recipe.window != None:
-                recipe.window.refresh_name()
-        elif col == 2:
-            recipe.category = value
-
-        return True       
-
-    def new_entry(self):
-        def create_function(new_id):
-            rec = Recipe(new_id, self.cookbook)
-            return self.cookbook.register_recipe(rec)
-        create_new(self.parent(), "recipe", create_function)
-    
-    def delete_entry(self, row):
-        self.cookbook.delete_recipe(row, self.parent()) 
-
- 
-class RecipeDashTable(DashboardTable):
-    ModelClass = RecipeDashModel 
-    item_name = "recipe"
-    default_widths = [(0, 150), (2, 150), (3, 100), (4, 100)]
-    fixed_widths = [3, 4]
-    stretch_widths = [1]
-
-
-
-class RecipeView(QWidget):
-    def __init__(self, recipe, parent):
-        super().__init__(parent = parent)
-        self.setWindowFlag(Qt.WindowType.Window)
-        self.resize(500, 700)
-        self.recipe = recipe
-
-        self.layout = QVBoxLayout()
-        self.layout.setSpacing(0)
-        no_margin(self.layout)
-        self.heading = QVBoxLayout()
-        general_margin(self.heading)
-        self.setLayout(self.layout)
-
-        hbox = QHBoxLayout()
-        self.name_label = Title("")
-        self.kcal_label = Title("")
-        self.time_label = Subtitle("")
-        hbox.addWidget(self.name_label)
-        hbox.addStretch(1)
-        hbox.addWidget(self.kcal_label)
-        self.heading.addLayout(hbox)
-        self.heading.addWidget(self.time_label)
-        self.layout.addLayout(self.heading)
-
-        self.refresh_name()
-
-        self.amounts_table = AmountsTable(self.recipe)
-        self.amounts_table.model.refresh.connect(self.refresh)
-        self.layout.addWidget(self.amounts_table)
-
-        self.steps_table = StepsTable(self.recipe.steps)
-        self.steps_table.model.refresh.connect(self.refresh)
-        self.layout.addWidget(self.steps_table)
-
-        self.controls = QHBoxLayout()
-        self.controls.setContentsMargins(15,15,15,15)
-        self.edit_button = QPushButton("")
-        self.edit_button.clicked.connect(self.toggle_edit)
-        self.set_editing(False)
-
-        self.controls.addStretch()
-        self.controls.addWidget(self.edit_button)
-
-        self.layout.addLayout(self.controls)
-        self.refresh()
-
-    def set_editing(self, edit):
-        self.editing = edit
-        if edit:
-            self.edit_button.setText("Save")
-        else:
-            self.edit_button.setText("Edit")
-        self.steps_table.set_editable(edit)
-        self.amounts_table.set_editable(edit)
-
-    def toggle_edit(self):
-        self.set_editing(not self.editing)
-
-    def refresh(self):
-        self.kcal_label.setText(f"{self.recipe.get_calories()} kcal")
-        self.time_label.setText(f"Preparation time {self.recipe.get_time()}")
-
-    def refresh_name(self):
-        self.setWindowTitle(f"Recipe '{self.recipe.name}'")
-        self.name_label.setText(self.recipe.name)
-
-class StepsTableModel(CoreTableModel):
-    header_names = ["Step", "Duration", "End time"]
-    align = ["left", "", ""]
-    refresh = pyqtSignal()
-
-    def sum_seconds(self, row):
-        return sum([st.seconds for st in self.content[:row+1]])
-
-    def get_data(self, row, col):
-        step = self.content[row]
-        if col == 0:
-            return step.description
-        elif col == 1:
-            return time_string(step.seconds)
-        elif col == 2:
-            return time_string(self.sum_seconds(row))
-   
-    def set_data(self, row, col, value):
-        step = self.content[row]
-        if col == 0:
-            step.description = value
-            return True
-        try:
-            value = parse_time(value)
-        except:
-            return False
-        if col == 1:
-            step.seconds = value
-        elif col == 2:
-            seconds = value - self.sum_seconds(row) + step.seconds
-            if seconds >= 0:
-                step.seconds = seconds
-            else:
-                return False
-        self.refresh.emit()
-        self.update_row(row)
-        self.update_col(2)
-
-        return True
-
-    def new_entry(self):
-        self.content.append(Step("", 0))
-
-    def dolete_entry(self, row):
-        del self.content[row]
-
-class StepsTable(FixTable):
-    ModelClass = StepsTableModel
-    item_name = "step"
-    default_widths = [(1,100), (2,100)]
-    fixed_widths = [1,2]
-    stretch_widths = [0]
-
-
-class AmountsTableModel(CoreTableModel):
-    header_names = ["Ingredient", "Amount"]
-    align = ["right", ""]
-    refresh = pyqtSignal()
-
-    def __init__(self, parent, recipe):
-        self.recipe = recipe
-        self.cookbook = recipe.cookbook
-        super().__init__(parent, recipe.amounts)
-
-    def deep_data(self, row, col, is_display):
-        ing, amount = self.content[row]
-        if col == 0:
-            if is_display:
-                return ing.name
-            else:
-                return ing._id
-        elif col == 1:
-            if is_display:
-                return f"{amount} {ing.unit}"
-            else:
-                return str(amount)
-   
-    def set_data(self, row, col, value):
-        if col == 0:
-            self.recipe.change_amounts(row, component = value)
-        elif col == 1:
-            self.recipe.change_amounts(row, amount = value)
-        else:
-            return False
-
-        self.refresh.emit()
-        return True
-
-    def new_entry(self):
-        new_id, ok = QInputDialog.getText(self.parent(), "New ingredient",
-            "Please specify the name of an ingredient or recipe:")
-        self.recipe.new_component(new_id) 
-
-    def dolete_entry(self, row):
-        component = self.content[row][0]
-        self.cookbook.unlink_component(self.recipe, component)
-        del self.content[row]
-
-class AmountsTable(FixTable):
-    ModelClass = AmountsTableModel
-    item_name = "ingredient"
-    default_widths = [(1,100),]
-    fixed_widths = [1]
-    stretch_widths = [0]
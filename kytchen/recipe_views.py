@@ -0,0 +1,251 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import (
+    QInputDialog, QWidget, QHBoxLayout, QVBoxLayout, QPushButton
+)
+
+from .views import (
+    DashboardTable, DashboardTableModel, CoreTableModel, FixTable,
+    create_new, Title, Subtitle, general_margin, no_margin
+)
+from .cookbook import can_delete_component
+from .recipe import Recipe, Step, time_string, parse_time
+from .amounts import to_str
+
+
+class RecipeDashModel(DashboardTableModel):
+    header_names = ["ID", "Recipe name", "Category", "kcal", "Prep. time", ""]
+    align = ["", "left", "", "", "", "", ""]
+    not_editable = [3, 4, 5]
+
+    def __init__(self, parent, cookbook):
+        self.cookbook = cookbook
+        super().__init__(parent, cookbook.recipes, cookbook)
+
+    def get_data(self, row, col):
+        recipe = self.content[row]
+        return recipe._col(col)
+
+
+    def set_data(self, row, col, value):
+        recipe = self.content[row]
+        if col == 0:
+            self.cookbook.update_component_id(recipe, value) 
+        elif col == 1:
+            recipe.name = value
+            if recipe.window != None:
+                recipe.window.refresh_name()
+        elif col == 2:
+            recipe.category = value
+        if col != 0:
+            self.cookbook.changed(recipe)
+
+        return True       
+
+    def new_entry(self):
+        def create_function(new_id):
+            rec = Recipe(new_id, self.cookbook)
+            return self.cookbook.register_recipe(rec)
+        create_new(self.parent(), "recipe", create_function)
+    
+    def can_delete_entry(self, row):
+        return can_delete_component(self.content[row], self.parent())
+
+    def delete_entry(self, row):
+        self.cookbook.delete_recipe(row, self.parent()) 
+
+ 
+class RecipeDashTable(DashboardTable):
+    ModelClass = RecipeDashModel 
+    item_name = "recipe"
+    default_widths = [(0, 150), (2, 150), (3, 100), (4, 100)]
+    fixed_widths = [3, 4]
+    stretch_widths = [1]
+
+
+
+class RecipeView(QWidget):
+    def __init__(self, recipe, parent):
+        super().__init__(parent = parent)
+        self.setWindowFlag(Qt.WindowType.Window)
+        self.resize(500, 700)
+        self.recipe = recipe
+
+        self.layout = QVBoxLayout()
+        self.layout.setSpacing(0)
+        no_margin(self.layout)
+        self.heading = QVBoxLayout()
+        general_margin(self.heading)
+        self.setLayout(self.layout)
+
+        hbox = QHBoxLayout()
+        self.name_label = Title("")
+        self.kcal_label = Title("")
+        self.time_label = Subtitle("")
+        hbox.addWidget(self.name_label)
+        hbox.addStretch(1)
+        hbox.addWidget(self.kcal_label)
+        self.heading.addLayout(hbox)
+        self.heading.addWidget(self.time_label)
+        self.layout.addLayout(self.heading)
+
+        self.refresh_name()
+
+        self.amounts_table = AmountsTable(self.recipe)
+        self.amounts_table.model.refresh.connect(self.refresh)
+        self.layout.addWidget(self.amounts_table)
+
+        self.steps_table = StepsTable(self.recipe)
+        self.steps_table.model.refresh.connect(self.refresh)
+        self.layout.addWidget(self.steps_table)
+
+        self.controls = QHBoxLayout()
+        self.controls.setContentsMargins(15,15,15,15)
+        self.edit_button = QPushButton("")
+        self.edit_button.clicked.connect(self.toggle_edit)
+        self.set_editing(False)
+
+        self.controls.addStretch()
+        self.controls.addWidget(self.edit_button)
+
+        self.layout.addLayout(self.controls)
+        self.refresh()
+
+    def set_editing(self, edit):
+        self.editing = edit
+        if edit:
+            self.edit_button.setText("Save")
+        else:
+            self.edit_button.setText("Edit")
+        self.steps_table.set_editable(edit)
+        self.amounts_table.set_editable(edit)
+
+    def toggle_edit(self):
+        self.set_editing(not self.editing)
+
+    def refresh(self):
+        self.kcal_label.setText(f"{to_str(self.recipe.get_calories())} kcal")
+        self.time_label.setText(f"Preparation time {self.recipe.get_time()}")
+
+    def refresh_name(self):
+        self.setWindowTitle(f"Recipe '{self.recipe.name}'")
+        self.name_label.setText(self.recipe.name)
+
+class StepsTableModel(CoreTableModel):
+    header_names = ["Step", "Duration", "End time"]
+    align = ["left", "", ""]
+    refresh = pyqtSignal()
+
+    def __init__(self, parent, recipe):
+        self.recipe = recipe
+        super().__init__(parent, recipe.steps)
+
+    def sum_seconds(self, row):
+        return self.content.elapsed(row)
+
+    def get_data(self, row, col):
+        step = self.content[row]
+        if col == 0:
+            return step.description
+        elif col == 1:
+            return time_string(step.seconds)
+        elif col == 2:
+            return time_string(self.sum_seconds(row))
+   
+    def set_data(self, row, col, value):
+        step = self.content[row]
+        if col == 0:
+            step.description = value
+            self.recipe.cookbook.changed(self.recipe)
+            return True
+        try:
+            value = parse_time(value)
+        except:
+            return False
+        if col == 1:
+            self.content.set_seconds(row, value)
+        elif col == 2:
+            seconds = value - self.sum_seconds(row) + step.seconds
+            if seconds >= 0:
+                self.content.set_seconds(row, seconds)
+            else:
+                return False
+        self.recipe.cookbook.changed(self.recipe)
+        self.refresh.emit()
+        # Only this step and the end times after it change.
+        self.dataChanged.emit(self.index(row, 0),
+                              self.index(len(self.content) - 1, self.ncols - 1))
+
+        return True
+
+    def new_entry(self):
+        self.content.append(Step("", 0))
+        self.recipe.cookbook.changed(self.recipe)
+
+    def delete_entry(self, row):
+        del self.content[row]
+        self.recipe.cookbook.changed(self.recipe)
+        self.refresh.emit()
+
+    def rows_moved(self):
+        self.recipe.cookbook.changed(self.recipe)
+
+class StepsTable(FixTable):
+    ModelClass = StepsTableModel
+    item_name = "step"
+    default_widths = [(1,100), (2,100)]
+    fixed_widths = [1,2]
+    stretch_widths = [0]
+
+
+class AmountsTableModel(CoreTableModel):
+    header_names = ["Ingredient", "Amount"]
+    align = ["right", ""]
+    refresh = pyqtSignal()
+
+    def __init__(self, parent, recipe):
+        self.recipe = recipe
+        self.cookbook = recipe.cookbook
+        super().__init__(parent, recipe.amounts)
+
+    def deep_data(self, row, col, is_display):
+        ing, amount = self.content[row]
+        if col == 0:
+            if is_display:
+                return ing.name
+            else:
+                return ing._id
+        elif col == 1:
+            if is_display:
+                return f"{to_str(amount)} {ing.unit}"
+            else:
+                return to_str(amount)
+   
+    def set_data(self, row, col, value):
+        if col == 0:
+            self.recipe.change_amounts(row, component = value)
+        elif col == 1:
+            self.recipe.change_amounts(row, amount = value)
+        else:
+            return False
+
+        self.refresh.emit()
+        return True
+
+    def new_entry(self):
+        new_id, ok = QInputDialog.getText(self.parent(), "New ingredient",
+            "Please specify the name of an ingredient or recipe:")
+        self.recipe.new_component(new_id) 
+
+    def delete_entry(self, row):
+        self.recipe.remove_component(row)
+        self.refresh.emit()
+
+    def rows_moved(self):
+        self.cookbook.changed(self.recipe)
+
+class AmountsTable(FixTable):
+    ModelClass = AmountsTableModel
+    item_name = "ingredient"
+    default_widths = [(1,100),]
+    fixed_widths = [1]
+    stretch_widths = [0]
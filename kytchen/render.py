@@ -0,0 +1,140 @@
+import math
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from . import amounts
+from .amounts import times, to_decimal, to_str, total_to_str
+from .recipe import time_string
+
+# Printable text for recipes, meal plans and shopping lists. Each document is
+# built from the sections yielded by a generator, which are joined once for
+# a string or written one by one to a file. The same code renders the
+# objects of a loaded cookbook and of a MappedCookbook.
+
+def recipe_parts(recipe, servings = 1):
+    calories = math.ceil(to_decimal(recipe.get_calories(servings)))
+    steps = list(recipe.steps)
+    total = sum(step.seconds for step in steps)
+    yield (f"{recipe.name}\nServings: {servings}\nCalories: {calories} kcal\n"
+           f"Preparation time: {time_string(total)}\n\nINGREDIENTS\n")
+    yield "".join([f"{to_str(times(amount, servings))} {ingredient.unit}  {ingredient.name}\n"
+                   for ingredient, amount in recipe.amounts])
+    lines = ["\nMETHOD"]
+    total = 0
+    for step in steps:
+        total += step.seconds
+        lines.append(f"\n- {step.description} ({time_string(step.seconds)})"
+                     f" >{time_string(total)}")
+    yield "".join(lines)
+
+def mealplan_parts(mealplan):
+    yield f"{mealplan.name}\n\n"
+    for i, day in enumerate(mealplan._days):
+        yield "".join([f"DAY {i + 1}"]
+                      + [f"\n- {item.name} ({to_str(amount)} {item.unit})"
+                         for item, amount in day]
+                      + ["\n\n"])
+    yield f"Average daily energy: {mealplan.get_calories()} kcal\n"
+
+def shopping_list_parts(mealplan):
+    shopping = sorted(mealplan._get_shopping().items(), key = lambda entry: entry[0].name)
+    yield "".join([f"{ingredient.name}: {total_to_str(amount)} {ingredient.unit}\n"
+                   for ingredient, amount in shopping])
+
+def render(parts):
+    return "".join(parts)
+
+# Batch export. The cookbook reaches the workers as a snapshot in the binary
+# format, which each of them loads once, instead of being pickled for each
+# task; a task is just a kind and a range of indices. Each worker writes the
+# documents it renders straight to their files. A MappedCookbook is shared
+# as the file it already is. The documents are the same as those rendered
+# here, in either amount mode: a loaded snapshot and a mapped cookbook give
+# the same values as the cookbook they come from.
+
+CHUNK_SIZE = 200
+
+def _safe_name(text):
+    return re.sub(r"[^\w.-]+", "_", text).strip("._") or "untitled"
+
+def _documents(cookbook, kind, index):
+    # File names and parts of the documents for one object. The index keeps
+    # names unique when ids or names only differ in characters left out.
+    if kind == "recipe":
+        recipe = cookbook.recipes[index]
+        yield f"recipe-{index + 1}-{_safe_name(recipe._id)}.txt", recipe_parts(recipe)
+    else:
+        mealplan = cookbook.mealplans[index]
+        name = f"{index + 1}-{_safe_name(mealplan.name)}.txt"
+        yield f"mealplan-{name}", mealplan_parts(mealplan)
+        yield f"shopping-{name}", shopping_list_parts(mealplan)
+
+def _write_range(cookbook, kind, start, end, directory):
+    paths = []
+    for index in range(start, end):
+        for name, parts in _documents(cookbook, kind, index):
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding = "utf-8") as f:
+                f.writelines(parts)
+            paths.append(path)
+    return paths
+
+_worker_cookbook = None
+
+def _open_snapshot(path, places, mapped):
+    # Workers may be started fresh, without the amount mode of the parent.
+    global _worker_cookbook
+    if places == None:
+        amounts.use_decimal()
+    else:
+        amounts.use_fixed_point(places)
+    if mapped:
+        from .mapped import MappedCookbook
+        _worker_cookbook = MappedCookbook(path)
+    else:
+        from .cookbook import Cookbook
+        _worker_cookbook = Cookbook.load(path)
+
+def _render_task(task):
+    return _write_range(_worker_cookbook, *task)
+
+def _tasks(cookbook, directory, chunk_size):
+    for kind, count in (("recipe", len(cookbook.recipes)),
+                        ("mealplan", len(cookbook.mealplans))):
+        for start in range(0, count, chunk_size):
+            yield (kind, start, min(start + chunk_size, count), directory)
+
+def export_documents(cookbook, directory, workers = None, chunk_size = CHUNK_SIZE):
+    # Writes a text file for every recipe, and a plan and a shopping list for
+    # every meal plan, to directory. Returns their paths. workers is the
+    # size of the process pool (None for one per CPU); with 0 or 1,
+    # everything is rendered here from the cookbook itself.
+    os.makedirs(directory, exist_ok = True)
+    if workers != None and workers <= 1:
+        paths = []
+        for task in _tasks(cookbook, directory, chunk_size):
+            paths.extend(_write_range(cookbook, *task))
+        return paths
+    from .cookbook import write_data
+    from .mapped import MappedCookbook
+    mapped = isinstance(cookbook, MappedCookbook)
+    snapshot = None
+    if mapped:
+        path = cookbook.path
+    else:
+        fd, snapshot = tempfile.mkstemp(suffix = ".kyb", prefix = "kytchen-")
+        os.close(fd)
+        write_data(snapshot, cookbook.export())
+        path = snapshot
+    try:
+        paths = []
+        with ProcessPoolExecutor(workers, initializer = _open_snapshot,
+                                 initargs = (path, amounts.fixed_point(), mapped)) as pool:
+            for written in pool.map(_render_task, _tasks(cookbook, directory, chunk_size)):
+                paths.extend(written)
+        return paths
+    finally:
+        if snapshot != None:
+            os.remove(snapshot)
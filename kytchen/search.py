@@ -0,0 +1,92 @@
+from collections import Counter
+
+from .ingredient import Ingredient
+from .recipe import Recipe
+
+# Trigram index over the text fields of the components and meal plans of a
+# cookbook. A query only looks at the entries that share its trigrams, and
+# those are then checked for the whole query. The list of entries for a
+# trigram is only built the first time a query uses it, which keeps building
+# the index cheap; after that it is kept up to date like the rest.
+
+def search_text(obj):
+    if isinstance(obj, Ingredient):
+        fields = (obj._id, obj.name, obj.unit)
+    elif isinstance(obj, Recipe):
+        fields = (obj._id, obj.name, obj.category)
+    else:
+        fields = (obj.name,)
+    # The separator cannot be typed, so no trigram spans two fields.
+    return "\0".join(str(field) for field in fields).casefold()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex():
+    def __init__(self, objects = ()):
+        self._texts = {}
+        self._postings = {}
+        # Changes whenever a query could give a different answer.
+        self.version = 0
+        for obj in objects:
+            self.add(obj)
+
+    def add(self, obj):
+        text = search_text(obj)
+        old = self._texts.get(obj)
+        if old == text:
+            return
+        if old != None:
+            self.remove(obj)
+        self._texts[obj] = text
+        self.version += 1
+        postings = self._postings
+        if postings:
+            for gram in trigrams(text):
+                if gram in postings:
+                    postings[gram].add(obj)
+
+    def remove(self, obj):
+        text = self._texts.pop(obj, None)
+        if text == None:
+            return
+        self.version += 1
+        postings = self._postings
+        for gram in trigrams(text):
+            if gram in postings:
+                postings[gram].discard(obj)
+
+    def _posting(self, gram):
+        entries = self._postings.get(gram)
+        if entries == None:
+            entries = {obj for obj, text in self._texts.items() if gram in text}
+            self._postings[gram] = entries
+        return entries
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, obj):
+        return obj in self._texts
+
+    def search(self, query, fuzzy = False):
+        # Everything that contains the query, ignoring case. With fuzzy, also
+        # entries that share most of its trigrams, which forgives a typo.
+        # Returns None for an empty query, which matches everything.
+        query = query.casefold()
+        if query == "":
+            return None
+        grams = trigrams(query)
+        if not grams:
+            # Too short for a trigram.
+            return {obj for obj, text in self._texts.items() if query in text}
+        if fuzzy:
+            counts = Counter()
+            for gram in grams:
+                counts.update(self._posting(gram))
+            needed = max(len(grams) - 3, (len(grams) + 1) // 2)
+            return {obj for obj, count in counts.items()
+                    if count >= needed or query in self._texts[obj]}
+        postings = sorted((self._posting(gram) for gram in grams), key = len)
+        candidates = postings[0].intersection(*postings[1:])
+        return {obj for obj in candidates if query in self._texts[obj]}
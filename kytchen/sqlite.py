@@ -0,0 +1,362 @@
+import sqlite3
+from collections.abc import MutableSequence
+
+from .cookbook import Cookbook
+from .ingredient import Ingredient
+from .recipe import Recipe, Step
+from .mealplan import Mealplan
+from .amounts import Amounts, parse, to_str
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    calories TEXT,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS components_order ON components (kind, position);
+CREATE TABLE IF NOT EXISTS steps (
+    recipe TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (recipe, position)
+);
+CREATE TABLE IF NOT EXISTS amounts (
+    recipe TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    component TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (recipe, position)
+);
+CREATE INDEX IF NOT EXISTS amounts_used ON amounts (component);
+CREATE TABLE IF NOT EXISTS mealplans (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    days INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    mealplan INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    component TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (mealplan, day, position)
+);
+CREATE INDEX IF NOT EXISTS meals_used ON meals (component);
+"""
+
+class _Components(dict):
+    # Component lookup that falls back to the database for components that
+    # have not been used yet.
+    def __init__(self, cookbook):
+        super().__init__()
+        self.cookbook = cookbook
+
+    def __missing__(self, key):
+        component = self.cookbook._fetch(key)
+        if component == None:
+            raise KeyError(key)
+        return component
+
+    def __contains__(self, key):
+        return super().__contains__(key) or self.cookbook._stored(key)
+
+class _LazyList(MutableSequence):
+    # Holds database keys until an entry is read for the first time, and
+    # then the object that was built for it.
+    def __init__(self, keys, fetch):
+        self._items = list(keys)
+        self._fetch = fetch
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self._items[index]
+        if isinstance(item, (str, int)):
+            item = self._fetch(item)
+            self._items[index] = item
+        return item
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+
+    def index_of_key(self, key):
+        return self._items.index(key)
+
+class SqliteCookbook(Cookbook):
+    # A cookbook stored in a SQLite database. Components and meal plans are
+    # only read when they are first used, and save writes back the ones
+    # that changed.
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._components = _Components(self)
+        self._stored_ids = {}
+        self._positions = {}
+        self._plan_rows = {}
+        self._dirty = {}
+        self._gone = set()
+        self._gone_plans = set()
+        self._aliases = {}
+        self._loading = 0
+
+        def ids(kind):
+            return [row[0] for row in self.db.execute(
+                "SELECT id FROM components WHERE kind = ? ORDER BY position",
+                (kind,))]
+        self.ingredients = _LazyList(ids("ingredient"), self._components.__getitem__)
+        self.recipes = _LazyList(ids("recipe"), self._components.__getitem__)
+        plans = [row[0] for row in self.db.execute(
+            "SELECT id FROM mealplans ORDER BY position")]
+        self.mealplans = _LazyList(plans, self._fetch_mealplan)
+        self._next_position = self.db.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM components").fetchone()[0]
+        self._next_plan = self.db.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM mealplans").fetchone()[0]
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    @classmethod
+    def create(cls, path, cookbook):
+        # Store a copy of an in-memory cookbook in a new database.
+        self = cls(path)
+        if not self.is_empty():
+            raise ValueError(f"{path} already contains a cookbook")
+        data = cookbook.export()
+        for ing in data["ingredients"]:
+            self.register_ingredient(Ingredient.load(ing))
+        for rec in data["recipes"]:
+            self.register_recipe(Recipe.load_steps(rec, self))
+        for rec in data["recipes"]:
+            self._components[rec["id"]].load_amounts(rec)
+        for plan in data["mealplans"]:
+            self.register_mealplan(Mealplan.load(plan, self))
+        self.save()
+        return self
+
+    def _stored(self, key):
+        if key in self._gone:
+            return False
+        row = self.db.execute(
+            "SELECT 1 FROM components WHERE id = ?", (key,)).fetchone()
+        return row != None
+
+    def _current_id(self, key):
+        # Ids in the database still refer to components by their old name
+        # until the rename is saved.
+        if key in self._aliases:
+            return self._aliases[key]._id
+        return key
+
+    def _fetch(self, key):
+        if key in self._gone:
+            return None
+        row = self.db.execute("SELECT kind, position, name, category, calories, unit "
+                              "FROM components WHERE id = ?", (key,)).fetchone()
+        if row == None:
+            return None
+        kind, position, name, category, calories, unit = row
+        self._loading += 1
+        try:
+            if kind == "ingredient":
+                component = Ingredient(key, name, parse(calories), unit)
+                dict.__setitem__(self._components, key, component)
+            else:
+                steps = [Step(description, seconds) for description, seconds
+                         in self.db.execute("SELECT description, seconds FROM steps "
+                            "WHERE recipe = ? ORDER BY position", (key,))]
+                component = Recipe(key, self, name, category, steps)
+                # Registered before its amounts, so that they can refer back.
+                dict.__setitem__(self._components, key, component)
+                amounts = self.db.execute("SELECT component, amount FROM amounts "
+                    "WHERE recipe = ? ORDER BY position", (key,)).fetchall()
+                for id_name, amount in amounts:
+                    component.new_component(self._current_id(id_name), amount, True)
+        finally:
+            self._loading -= 1
+        self._stored_ids[component] = key
+        self._positions[component] = position
+        return component
+
+    def _fetch_mealplan(self, row_id):
+        name, days = self.db.execute(
+            "SELECT name, days FROM mealplans WHERE id = ?", (row_id,)).fetchone()
+        mealplan = Mealplan(self, name)
+        self._loading += 1
+        try:
+            for _ in range(days):
+                mealplan._days.append(Amounts())
+            with mealplan.batch():
+                for day, id_name, amount in self.db.execute("SELECT day, component, amount "
+                        "FROM meals WHERE mealplan = ? ORDER BY day, position", (row_id,)):
+                    mealplan._new_component(mealplan._days[day],
+                                            self._current_id(id_name), amount)
+        finally:
+            self._loading -= 1
+        self._plan_rows[mealplan] = row_id
+        return mealplan
+
+    def used_by(self, component):
+        # Loads every recipe and meal plan that uses a component, so that
+        # its _used reverse edges are complete, and returns them.
+        key = self._stored_ids.get(component)
+        if key != None:
+            recipes = self.db.execute(
+                "SELECT DISTINCT recipe FROM amounts WHERE component = ?", (key,))
+            for (recipe,) in recipes.fetchall():
+                if recipe in self._aliases:
+                    continue
+                if recipe not in self._gone:
+                    self._components[recipe]
+            plans = self.db.execute(
+                "SELECT DISTINCT mealplan FROM meals WHERE component = ?", (key,))
+            for (row_id,) in plans.fetchall():
+                try:
+                    index = self.mealplans.index_of_key(row_id)
+                except ValueError:
+                    # Already loaded, or deleted.
+                    continue
+                self.mealplans[index]
+        return list(component._used)
+
+    def is_empty(self):
+        return len(self.ingredients) == 0 and len(self.recipes) == 0
+
+    def changed(self, obj, edit = None):
+        if self._loading:
+            return
+        super().changed(obj, edit)
+        self._dirty[obj] = None
+
+    def renamed(self, component, old):
+        super().renamed(component, old)
+        key = self._stored_ids.get(component)
+        if key != None:
+            self._aliases[key] = component
+            self._gone.add(key)
+            # The lists hold database ids, which now mean something else.
+            for components in (self.ingredients, self.recipes):
+                try:
+                    components[components.index_of_key(key)] = component
+                except ValueError:
+                    pass
+        self._dirty[component] = None
+
+    def removed(self, obj, index):
+        super().removed(obj, index)
+        self._dirty.pop(obj, None)
+        if isinstance(obj, Mealplan):
+            row_id = self._plan_rows.pop(obj, None)
+            if row_id != None:
+                self._gone_plans.add(row_id)
+        else:
+            key = self._stored_ids.pop(obj, None)
+            self._positions.pop(obj, None)
+            if key != None:
+                self._gone.add(key)
+
+    def delete_ingredient(self, index, view = None):
+        self.used_by(self.ingredients[index])
+        super().delete_ingredient(index, view)
+
+    def delete_recipe(self, index, view = None):
+        self.used_by(self.recipes[index])
+        super().delete_recipe(index, view)
+
+    def save(self, path = None):
+        if path != None and path != self.path:
+            return super().save(path)
+        with self.db:
+            self._save_renames()
+            for key in self._gone:
+                self.db.execute("DELETE FROM components WHERE id = ?", (key,))
+                self.db.execute("DELETE FROM steps WHERE recipe = ?", (key,))
+                self.db.execute("DELETE FROM amounts WHERE recipe = ?", (key,))
+            for row_id in self._gone_plans:
+                self.db.execute("DELETE FROM mealplans WHERE id = ?", (row_id,))
+                self.db.execute("DELETE FROM meals WHERE mealplan = ?", (row_id,))
+            for obj in self._dirty:
+                if isinstance(obj, Mealplan):
+                    self._save_mealplan(obj)
+                else:
+                    self._save_component(obj)
+        self._dirty = {}
+        self._gone = set()
+        self._gone_plans = set()
+        self._aliases = {}
+
+    def _save_renames(self):
+        # Two passes, so that swapping names between components works.
+        for n, key in enumerate(self._aliases):
+            for table in ("amounts", "meals"):
+                self.db.execute(f"UPDATE {table} SET component = ? WHERE component = ?",
+                                (f"\0{n}", key))
+        for n, component in enumerate(self._aliases.values()):
+            for table in ("amounts", "meals"):
+                self.db.execute(f"UPDATE {table} SET component = ? WHERE component = ?",
+                                (component._id, f"\0{n}"))
+            self._stored_ids[component] = component._id
+
+    def _save_component(self, component):
+        key = component._id
+        self._stored_ids[component] = key
+        if component not in self._positions:
+            self._positions[component] = self._next_position
+            self._next_position += 1
+        position = self._positions[component]
+        if isinstance(component, Ingredient):
+            self.db.execute("INSERT OR REPLACE INTO components VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, "ingredient", position, component.name, None,
+                 to_str(component.calories), component.unit))
+            return
+        self.db.execute("INSERT OR REPLACE INTO components VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, "recipe", position, component.name, component.category, None, None))
+        self.db.execute("DELETE FROM steps WHERE recipe = ?", (key,))
+        self.db.executemany("INSERT INTO steps VALUES (?, ?, ?, ?)",
+            [(key, i, step.description, step.seconds)
+             for i, step in enumerate(component.steps)])
+        self.db.execute("DELETE FROM amounts WHERE recipe = ?", (key,))
+        self.db.executemany("INSERT INTO amounts VALUES (?, ?, ?, ?)",
+            [(key, i, c._id, to_str(amount))
+             for i, (c, amount) in enumerate(component.amounts)])
+
+    def _save_mealplan(self, mealplan):
+        row_id = self._plan_rows.get(mealplan)
+        days = len(mealplan._days)
+        if row_id == None:
+            cursor = self.db.execute(
+                "INSERT INTO mealplans (position, name, days) VALUES (?, ?, ?)",
+                (self._next_plan, mealplan.name, days))
+            self._next_plan += 1
+            row_id = cursor.lastrowid
+            self._plan_rows[mealplan] = row_id
+        else:
+            self.db.execute("UPDATE mealplans SET name = ?, days = ? WHERE id = ?",
+                (mealplan.name, days, row_id))
+            self.db.execute("DELETE FROM meals WHERE mealplan = ?", (row_id,))
+        self.db.executemany("INSERT INTO meals VALUES (?, ?, ?, ?, ?)",
+            [(row_id, day, i, component._id, to_str(amount))
+             for day, entries in enumerate(mealplan._days)
+             for i, (component, amount) in enumerate(entries)])
+
+    def close(self):
+        super().close()
+        self.db.close()
@@ -0,0 +1,147 @@
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+# What can end a value that spans chunks, inside and outside strings.
+_in_string = re.compile(r'[\\"]')
+_in_container = re.compile(r'["\[\]{}]')
+_after_scalar = re.compile(r'[\s,\]}:]')
+
+class _Reader():
+    def __init__(self, f, chunk_size, progress = None):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.read = 0
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def chunk(self):
+        if self.eof:
+            return ""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        elif self.progress != None:
+            self.read += len(chunk)
+            self.progress(self.read)
+        return chunk
+
+    def fill(self):
+        chunk = self.chunk()
+        if not chunk:
+            return False
+        # Drop whatever has already been parsed before growing the buffer.
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer):
+                if self.buffer[self.pos] not in _whitespace:
+                    return self.buffer[self.pos]
+                self.pos += 1
+            if not self.fill():
+                raise ValueError("unexpected end of cookbook file")
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"expected one of {chars!r} at {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        first = self.peek()
+        if (first not in '"[{' and not self.eof
+            and _after_scalar.search(self.buffer, self.pos) == None):
+            # A number at the very end of the buffer might continue.
+            self.gather()
+        try:
+            value, end = _decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            # The value may just be cut in half by the end of the chunk.
+            if self.eof:
+                raise
+            self.gather()
+            value, end = _decoder.raw_decode(self.buffer, self.pos)
+        self.pos = end
+        return value
+
+    def gather(self):
+        # Reads on until the buffer holds the whole value at pos. Parsing it
+        # again after every chunk would take time quadratic in its length,
+        # so each chunk is only scanned once for the end of the value, and
+        # the chunks are joined once it is found.
+        text = self.buffer[self.pos:]
+        parts = [text]
+        first = text[0]
+        depth = 0 if first == '"' else 1
+        string = first == '"'
+        i = 1
+        while True:
+            if first not in '"[{':
+                found = _after_scalar.search(text, i)
+                if found != None:
+                    break
+            else:
+                while True:
+                    found = (_in_string if string else _in_container).search(text, i)
+                    if found == None:
+                        break
+                    char = found.group()
+                    i = found.end()
+                    if char == "\\":
+                        # Skips the escaped character, maybe in the next chunk.
+                        i += 1
+                    elif char == '"':
+                        string = not string
+                        if not string and depth == 0:
+                            break
+                    elif char in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            break
+                if found != None:
+                    break
+            i = max(i - len(text), 0)
+            text = self.chunk()
+            if not text:
+                break
+            parts.append(text)
+        self.buffer = "".join(parts)
+        self.pos = 0
+
+# Parse the top-level JSON object of a file without reading all of it at
+# once. Yields (key, element) for every element of every array in it, in
+# file order, so each element can be used and dropped before the next one is
+# parsed. Values that are not arrays are yielded whole as (key, value).
+# progress, if given, is called with the number of characters read so far.
+def iter_sections(f, chunk_size = CHUNK_SIZE, progress = None):
+    reader = _Reader(f, chunk_size, progress)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            yield key, reader.value()
+        if reader.expect(",}") == "}":
+            return
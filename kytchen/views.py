@@ -1,6 +1,6 @@
 from PyQt6.QtCore import (
     QAbstractTableModel, Qt, QSortFilterProxyModel, pyqtSignal,
-    QModelIndex, QEvent
+    QModelIndex, QEvent, QTimer
 )
 from PyQt6.QtWidgets import (
     QTableView, QMenu, QHeaderView, QWidget, QHBoxLayout, QVBoxLayout,
@@ -8,13 +8,16 @@ from PyQt6.QtWidgets import (
     QApplication, QMessageBox, QInputDialog, QLabel, QAbstractItemView
 )
 from PyQt6.QtGui import QFont
-from decimal import Decimal
 
-def num(value):
-    value = Decimal(value)
-    if value < 0:
-        raise ValueError("expected non-negative amount")
-    return value
+# num lives in kytchen.amounts now; it is still importable from here.
+from .amounts import num
+
+__all__ = [
+    "num", "show_error", "create_new", "general_margin", "no_margin", "Title",
+    "Subtitle", "ClickLabel", "CoreTableModel", "CoreTable", "ReverseSortProxy",
+    "SortTableModel", "SortTable", "ButtonDelegate", "DashboardTableModel",
+    "DashboardTable", "FixTable",
+]
 
 def show_error(view, msg):
     msg_box = QMessageBox(view)
@@ -71,14 +74,86 @@ class CoreTableModel(QAbstractTableModel):
     header_names = []
     align = []
     not_editable = []
+    # Rows shown at first and added each time the view scrolls to the end,
+    # or None to show every row at once.
+    page_size = None
 
     def __init__(self, parent, content):
         super().__init__(parent)
         self.content = content
         self.ncols = len(self.header_names)
+        # The view knows about the first `loaded` entries of the content and,
+        # after them, `_tail` entries starting at `_tail_start`: the ones
+        # added while the rest of the content was not fetched yet. Anything
+        # else is announced with beginInsertRows before it counts.
+        self.loaded = 0
+        self._tail = 0
+        self._tail_start = 0
+        # Nothing is fetched while rows are announced, or while
+        # general_new_row adds entries: the view would be told about the same
+        # rows twice.
+        self._inserting = False
+        self._reset_loaded()
+        self.modelReset.connect(self._reset_loaded)
+
+    def _reset_loaded(self):
+        self._tail = 0
+        if self.page_size == None:
+            self.loaded = len(self.content)
+        else:
+            self.loaded = min(self.page_size, len(self.content))
+
+    def content_row(self, row):
+        # Index in the content of a row of the model.
+        if row < self.loaded:
+            return row
+        return self._tail_start + row - self.loaded
 
     def rowCount(self, parent = None):
-        return len(self.content)
+        if parent != None and parent.isValid():
+            return 0
+        return min(self.loaded + self._tail, len(self.content))
+
+    def canFetchMore(self, parent):
+        if parent.isValid() or self._inserting:
+            return False
+        return self.loaded + self._tail < len(self.content)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        if self.page_size == None:
+            self.fetch_all()
+        else:
+            self._load(self.loaded + self.page_size)
+
+    def fetch_all(self):
+        self._load(len(self.content))
+
+    def _load(self, count):
+        if self._inserting:
+            return
+        count = min(count, len(self.content))
+        while self.loaded < count:
+            if self._tail and self.loaded == self._tail_start:
+                # The gap is closed, so the tail is just more of the start.
+                self.loaded += self._tail
+                self._tail = 0
+                continue
+            end = self._tail_start if self._tail else len(self.content)
+            stop = min(count, end)
+            self._begin_insert(self.loaded, stop - 1)
+            self.loaded = stop
+            self.endInsertRows()
+
+    def _begin_insert(self, first, last):
+        # Views may ask for more rows when they hear about these, before they
+        # are counted.
+        self._inserting = True
+        try:
+            self.beginInsertRows(QModelIndex(), first, last)
+        finally:
+            self._inserting = False
 
     def columnCount(self, parent = None):
         return self.ncols
@@ -101,7 +176,8 @@ class CoreTableModel(QAbstractTableModel):
             else:
                 return Qt.AlignmentFlag.AlignCenter
         if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-            return self.deep_data(index.row(), index.column(), role == Qt.ItemDataRole.DisplayRole)
+            return self.deep_data(self.content_row(index.row()), index.column(),
+                                  role == Qt.ItemDataRole.DisplayRole)
 
     def headerData(self, section, orientation, role = Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole:
@@ -133,7 +209,7 @@ class CoreTableModel(QAbstractTableModel):
     def setData(self, index, value, role = Qt.ItemDataRole.EditRole):
         if not index.isValid() or not role == Qt.ItemDataRole.EditRole:
             return False
-        changed = self.set_data(index.row(), index.column(), value)
+        changed = self.set_data(self.content_row(index.row()), index.column(), value)
         if not changed:
             return False
         self.dataChanged.emit(index, index)
@@ -151,21 +227,67 @@ class CoreTableModel(QAbstractTableModel):
     def new_entry(self):
         return None
 
-    def general_new_row(self):
-        self.beginResetModel() 
-        self.new_entry()
-        self.endResetModel()
+    def general_new_row(self, create = None):
+        # New entries are appended to the content by create, which can add
+        # any number of them instead of new_entry and may ask for them in a
+        # dialog first. The model only counts them once they are announced
+        # below, even if the view asks it to fetch more in the meantime.
+        length = len(self.content)
+        if create == None:
+            create = self.new_entry
+        self._inserting = True
+        try:
+            create()
+        finally:
+            self._inserting = False
+        added = len(self.content) - length
+        if added <= 0:
+            return
+        if self.loaded + self._tail == length:
+            self.fetch_all()
+            return
+        # Rows are still waiting to be fetched: show the new ones after the
+        # loaded rows, instead of fetching everything before them.
+        if self._tail != 0 and self._tail_start + self._tail != length:
+            self.fetch_all()
+            return
+        first = self.rowCount()
+        self._begin_insert(first, first + added - 1)
+        if self._tail == 0:
+            self._tail_start = length
+        self._tail += added
+        self.endInsertRows()
+
+    def view_index(self, row):
+        return self.index(row, 0)
+
+    def can_delete_entry(self, row):
+        return True
 
     def delete_entry(self, row):
         return None
 
+    def rows_moved(self):
+        return None
+
     def general_delete_row(self, index, by_row = False):
         if by_row:
-            index = self.index(index, 0)
-        index = self.table_index(index)
-        index = index.row()
-        self.beginRemoveRows(QModelIndex(), index, index)
-        self.delete_entry(index)
+            index = self.view_index(index)
+        row = self.source_index(index).row()
+        if row < 0:
+            return
+        # Deleting can be refused (a component that is still in use), which
+        # has to be known before the view is told the row is going.
+        content_row = self.content_row(row)
+        if not self.can_delete_entry(content_row):
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.delete_entry(content_row)
+        if row < self.loaded:
+            self.loaded -= 1
+            self._tail_start -= 1
+        else:
+            self._tail -= 1
         self.endRemoveRows()
 
 class CoreTable(QWidget):
@@ -248,14 +370,122 @@ class CoreTable(QWidget):
         self.control_bar_widget.setVisible(edit)
 
 class ReverseSortProxy(QSortFilterProxyModel):
-    def lessThan(self, left, right):
-        return not super().lessThan(left, right)
+    fuzzy = False
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.text = ""
+        self.matches = None
+        self._version = None
+
+    def sort(self, column, order = Qt.SortOrder.AscendingOrder):
+        # Same as reversing lessThan, without a Python call per comparison.
+        if order == Qt.SortOrder.AscendingOrder:
+            order = Qt.SortOrder.DescendingOrder
+        else:
+            order = Qt.SortOrder.AscendingOrder
+        super().sort(column, order)
+
+    def set_search(self, text):
+        # Only rows the view knows about can be filtered in.
+        if text != "":
+            self.sourceModel().fetch_all()
+        self.text = text
+        self._version = None
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        # The text is looked up in the cookbook's search index once, and
+        # again only when the index changes, so that filtering a row is a
+        # set lookup instead of a scan over every column.
+        if self.text == "":
+            return True
+        model = self.sourceModel()
+        version = model.search_version()
+        if version != self._version:
+            self.matches = model.search(self.text, self.fuzzy)
+            self._version = version
+        return (self.matches == None
+                or model.content[model.content_row(row)] in self.matches)
 
 class SortTableModel(CoreTableModel):
-    def __init__(self, parent, content):
+    page_size = 500
+
+    def __init__(self, parent, content, cookbook = None):
         super().__init__(parent, content)
         self.proxy = None
-    
+        # Sorting and filtering read every cell many times, so the values of
+        # each row are kept, by object, until that object changes.
+        self._rows = {}
+        self._stale = None
+        self.dataChanged.connect(self._forget_rows)
+        for signal in (self.modelReset, self.rowsRemoved, self.rowsMoved,
+                       self.layoutChanged):
+            signal.connect(self._clear_rows)
+        self.rowsInserted.connect(self._rows_inserted)
+        self._search_index = None
+        if cookbook != None:
+            watcher = self.forget
+            cookbook.watchers.append(watcher)
+            self.destroyed.connect(lambda: cookbook.watchers.remove(watcher)
+                                   if watcher in cookbook.watchers else None)
+            self._search_index = cookbook.search_index
+
+    def search(self, text, fuzzy = False):
+        if self._search_index == None:
+            return None
+        return self._search_index().search(text, fuzzy)
+
+    def search_version(self):
+        if self._search_index == None:
+            return 0
+        return self._search_index().version
+
+    def data(self, index, role = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role != Qt.ItemDataRole.DisplayRole and role != Qt.ItemDataRole.EditRole:
+            return super().data(index, role)
+        row = index.row()
+        obj = self.content[self.content_row(row)]
+        entry = self._rows.get(obj)
+        if entry == None:
+            entry = self._rows[obj] = (row, {})
+        key = (index.column(), role)
+        values = entry[1]
+        if key not in values:
+            values[key] = super().data(index, role)
+        return values[key]
+
+    def _clear_rows(self, *args):
+        self._rows.clear()
+
+    def _rows_inserted(self, parent, first, last):
+        # Rows fetched at the end do not move any cached row.
+        if last + 1 < self.rowCount():
+            self._rows.clear()
+
+    def _forget_rows(self, top, bottom):
+        for row in range(top.row(), bottom.row() + 1):
+            self._rows.pop(self.content[self.content_row(row)], None)
+
+    def forget(self, obj):
+        # Objects can change several times in one edit, so the rows are
+        # updated once control gets back to the event loop.
+        if obj not in self._rows:
+            return
+        if self._stale == None:
+            self._stale = {}
+            QTimer.singleShot(0, self._update_stale)
+        self._stale[obj] = self._rows.pop(obj)[0]
+
+    def _update_stale(self):
+        stale = self._stale
+        self._stale = None
+        for obj, row in stale.items():
+            if row < self.rowCount() and self.content[self.content_row(row)] is obj:
+                self.update_row(row)
+
     def table_index(self, index):
         if self.proxy != None:
             return self.proxy.mapFromSource(index)
@@ -271,6 +501,11 @@ class SortTableModel(CoreTableModel):
     def set_proxy(self, proxy):
         self.proxy = proxy
 
+    def view_index(self, row):
+        if self.proxy != None:
+            return self.proxy.index(row, 0)
+        return self.index(row, 0)
+
 class SortTable(CoreTable):
     ModelClass = SortTableModel
     def __init__(self, content):
@@ -278,18 +513,19 @@ class SortTable(CoreTable):
         sort_model = ReverseSortProxy(self.table)
         sort_model.setSourceModel(self.model)
         sort_model.setDynamicSortFilter(True)
-        sort_model.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        sort_model.setFilterKeyColumn(-1)
         self.model.set_proxy(sort_model)
 
         search_box = QLineEdit()
         search_box.setPlaceholderText("Search...")
         search_box.setMinimumHeight(35)
-        search_box.textChanged.connect(sort_model.setFilterFixedString)
+        search_box.textChanged.connect(sort_model.set_search)
         self.layout.insertWidget(0, search_box)
 
         self.table.setModel(sort_model)
         self.table.setSortingEnabled(True)
+        # Sorting by a column is only meaningful over every row.
+        self.table.horizontalHeader().sectionClicked.connect(
+            lambda section: self.model.fetch_all())
 
 class ButtonDelegate(QStyledItemDelegate):
 
@@ -323,7 +559,7 @@ class DashboardTableModel(SortTableModel):
         if not index.isValid():
             return None
         index = self.source_index(index)
-        self.content[index.row()].get_window()
+        self.content[self.content_row(index.row())].get_window()
 
     def data(self, index, role):
         if not index.isValid():
@@ -372,6 +608,7 @@ class FixTable(CoreTable):
             self.model.beginMoveRows(QModelIndex(), row, row, QModelIndex(), row - 1)
             self.data[row - 1], self.data[row] = self.data[row], self.data[row - 1]
             self.model.endMoveRows()
+            self.model.rows_moved()
             self.table.selectRow(row - 1)
 
     def move_down(self):
@@ -381,6 +618,7 @@ class FixTable(CoreTable):
             self.model.beginMoveRows(QModelIndex(), row, row, QModelIndex(), row + 2)
             self.data[row + 1], self.data[row] = self.data[row], self.data[row + 1]
             self.model.endMoveRows()
+            self.model.rows_moved()
             self.table.selectRow(row + 1)
 
 
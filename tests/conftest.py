@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from kytchen import amounts
+
+# Crepes from batter, which is a recipe itself, and a plan of two days.
+SAMPLE = {
+    "ingredients": [
+        {"id": "flour", "name": "Flour", "calories": "3.6", "unit": "g"},
+        {"id": "egg", "name": "Egg", "calories": "70", "unit": "g"},
+        {"id": "milk", "name": "Milk", "calories": "0.6", "unit": "g"},
+        {"id": "sugar", "name": "Sugar", "calories": "4", "unit": "g"},
+    ],
+    "recipes": [
+        {"id": "batter", "name": "Batter", "category": "base",
+         "steps": [["mix", 60], ["rest", 600]],
+         "amounts": [["flour", "100"], ["egg", "2"], ["milk", "200"]]},
+        {"id": "crepes", "name": "Crepes", "category": "dessert",
+         "steps": [["fry", 300]],
+         "amounts": [["batter", "0.5"], ["sugar", "10"]]},
+    ],
+    "mealplans": [
+        {"name": "week", "days": [[["crepes", "2"], ["egg", "1"]], [["batter", "1"]]]},
+    ],
+}
+
+@pytest.fixture(autouse = True)
+def decimal_mode():
+    # The amount mode is global, so every test starts and ends with Decimals.
+    amounts.use_decimal()
+    yield
+    amounts.use_decimal()
+
+@pytest.fixture
+def sample_path(tmp_path):
+    path = tmp_path / "sample.js"
+    path.write_text(json.dumps(SAMPLE))
+    return str(path)
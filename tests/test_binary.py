@@ -0,0 +1,36 @@
+import pytest
+
+from kytchen import amounts, binary
+from kytchen.cookbook import Cookbook
+from kytchen.mapped import MappedCookbook, write_mapped
+
+@pytest.mark.parametrize("places", [None, 6])
+def test_binary_load_matches_json_load(sample_path, tmp_path, places):
+    if places != None:
+        amounts.use_fixed_point(places)
+    cookbook = Cookbook.load(sample_path)
+    path = str(tmp_path / "sample.kyb")
+    cookbook.save(path)
+    assert binary.is_binary(path)
+    assert Cookbook.load(path).export() == cookbook.export()
+    mapped_path = str(tmp_path / "mapped.kyb")
+    write_mapped(cookbook, mapped_path)
+    assert Cookbook.load(mapped_path).export() == cookbook.export()
+
+@pytest.mark.parametrize("places", [None, 6])
+def test_mapped_results_match_loaded_ones(sample_path, tmp_path, places):
+    if places != None:
+        amounts.use_fixed_point(places)
+    cookbook = Cookbook.load(sample_path)
+    path = str(tmp_path / "mapped.kyb")
+    write_mapped(cookbook, path)
+    with MappedCookbook(path) as mapped:
+        assert [r._id for r in mapped.recipes] == [r._id for r in cookbook.recipes]
+        for recipe, other in zip(cookbook.recipes, mapped.recipes):
+            assert ([(c._id, v) for c, v in recipe.amounts]
+                    == [(c._id, v) for c, v in other.amounts])
+            assert recipe.get_seconds() == other.get_seconds()
+            assert recipe.get_calories(3) == other.get_calories(3)
+        for plan, other in zip(cookbook.mealplans, mapped.mealplans):
+            assert plan.get_shopping_list() == other.get_shopping_list()
+            assert plan.get_calories() == other.get_calories()
@@ -0,0 +1,32 @@
+import json
+from decimal import Decimal
+
+from kytchen.cli import main
+
+def _bad_cookbook(tmp_path):
+    path = tmp_path / "bad.js"
+    path.write_text(json.dumps({
+        "ingredients": [{"id": "a", "name": "A", "calories": "1.x", "unit": "g"}],
+        "recipes": [], "mealplans": []}))
+    return str(path)
+
+def _lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+def test_kcal_reports_a_bad_cookbook_and_goes_on(tmp_path, sample_path, capsys):
+    bad = _bad_cookbook(tmp_path)
+    assert main(["kcal", bad, sample_path]) == 1
+    lines = _lines(capsys)
+    assert lines[0]["cookbook"] == bad and "error" in lines[0]
+    assert [(line["id"], Decimal(line["kcal"])) for line in lines[1:]] == [
+        ("batter", 620), ("crepes", 350)]
+
+def test_bad_cookbook_fails_without_traceback(tmp_path, capsys):
+    assert main(["scale", _bad_cookbook(tmp_path), "2", "a"]) == 2
+    assert capsys.readouterr().err.startswith("kytchen-cli: ")
+
+def test_missing_database_is_not_created(tmp_path, capsys):
+    path = tmp_path / "missing.db"
+    assert main(["kcal", str(path)]) == 1
+    assert "error" in _lines(capsys)[0]
+    assert not path.exists()
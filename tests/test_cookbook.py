@@ -0,0 +1,25 @@
+import pytest
+
+from kytchen import cookbook as cookbook_module
+from kytchen.cookbook import Cookbook
+
+def test_cancelled_load_leaves_no_journal_open(sample_path, monkeypatch):
+    cookbook = Cookbook.load(sample_path, journal = True)
+    cookbook._components["egg"].name = "Eggs"
+    cookbook.changed(cookbook._components["egg"])
+    cookbook.close()
+    opened = []
+    class Journal(cookbook_module.Journal):
+        def __init__(self, *args):
+            super().__init__(*args)
+            opened.append(self)
+    monkeypatch.setattr(cookbook_module, "Journal", Journal)
+    def progress(fraction):
+        if fraction == 1.0:
+            raise InterruptedError
+    with pytest.raises(InterruptedError):
+        Cookbook.load(sample_path, journal = True, progress = progress)
+    assert opened == []
+    loaded = Cookbook.load(sample_path, journal = True)
+    assert len(opened) == 1 and loaded._components["egg"].name == "Eggs"
+    loaded.close()
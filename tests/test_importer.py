@@ -0,0 +1,14 @@
+from kytchen.cookbook import Cookbook
+from kytchen.importer import UPDATE, import_ingredients
+
+def test_update_counts_only_changed_ingredients(sample_path, tmp_path):
+    cookbook = Cookbook.load(sample_path)
+    path = tmp_path / "ingredients.csv"
+    path.write_text("id,name,calories,unit\n"
+                    "egg,Egg,70,g\n"
+                    "milk,Whole milk,0.65,ml\n"
+                    "batter,Batter,1,g\n"
+                    "salt,Salt,0,g\n")
+    report = import_ingredients(cookbook, str(path), UPDATE)
+    assert (report.added, report.updated, report.skipped) == (1, 1, ["batter"])
+    assert cookbook._components["milk"].name == "Whole milk"
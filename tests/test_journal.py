@@ -0,0 +1,65 @@
+import pytest
+
+from kytchen import amounts
+from kytchen.cookbook import Cookbook
+from kytchen.ingredient import Ingredient
+from kytchen.mealplan import Mealplan
+
+@pytest.fixture
+def journaled(sample_path):
+    cookbook = Cookbook.load(sample_path, journal = True)
+    yield cookbook
+    cookbook.close()
+
+def _replayed(cookbook):
+    cookbook.journal.flush()
+    return Cookbook.load(cookbook.path).export()
+
+def test_bad_amount_leaves_the_entry_as_it_was(journaled):
+    crepes = journaled._components["crepes"]
+    before = crepes.export()
+    assert not crepes.change_amounts(1, component = "egg", amount = "1.x")
+    assert crepes.export() == before
+    assert journaled._components["sugar"]._used
+    with pytest.raises(ValueError):
+        crepes.change_amounts(1, component = "egg", amount = "1.x", strict = True)
+    assert crepes.export() == before
+    assert _replayed(journaled) == journaled.export()
+
+def _edit(cookbook):
+    batter = cookbook._components["batter"]
+    crepes = cookbook._components["crepes"]
+    batter.change_amounts(0, amount = "120")
+    batter.new_component("sugar", "5")
+    crepes.remove_component(1)
+    crepes.change_amounts(0, component = "egg", amount = "3")
+    cookbook._components["milk"].calories = amounts.parse("0.7")
+    cookbook.changed(cookbook._components["milk"])
+    cookbook.register_ingredient(Ingredient("salt", "salt", 0, "g"))
+    plan = cookbook.mealplans[0]
+    plan.new_day()
+    plan._new_component(plan._days[-1], "salt", "1")
+    plan._change_amount(plan._days[0], 1, "2")
+    with plan.batch():
+        plan._remove_component(plan._days[1], 0)
+        plan._new_component(plan._days[1], "crepes", "4")
+        plan.new_day()
+        plan._new_component(plan._days[-1], "batter", "0.5")
+    plan.remove_day(0)
+    cookbook.register_mealplan(Mealplan(cookbook, "next"))
+    cookbook.mealplans[1].new_day()
+    cookbook.mealplans[1]._new_component(cookbook.mealplans[1]._days[0], "egg", "6")
+    cookbook.update_component_id(cookbook._components["batter"], "dough")
+
+def test_replay_matches_the_live_cookbook(journaled):
+    _edit(journaled)
+    assert _replayed(journaled) == journaled.export()
+    journaled.delete_mealplan(0)
+    journaled.delete_ingredient(journaled.ingredients.index(journaled._components["salt"]))
+    assert _replayed(journaled) == journaled.export()
+
+def test_compaction_keeps_every_change(journaled):
+    _edit(journaled)
+    journaled.journal.compact(wait = True)
+    journaled.mealplans[0]._change_amount(journaled.mealplans[0]._days[0], 0, "5")
+    assert _replayed(journaled) == journaled.export()
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from kytchen import amounts
+from kytchen.amounts import total_to_str
+from kytchen.cookbook import Cookbook
+
+def _brute_totals(plan, start, end):
+    total = {}
+    for day in plan._days[start:end]:
+        for component, amount in day:
+            for ingredient, share in component._flat().items():
+                total[ingredient] = total.get(ingredient, 0) + amount * share
+    return {ing: amount for ing, amount in total.items() if amount != 0}
+
+def _check_ranges(plan, rng):
+    days = len(plan._days)
+    ranges = [(0, None), (0, days), (1, days - 1), (days // 3, days)]
+    ranges += [tuple(sorted(rng.sample(range(days + 1), 2))) for _ in range(12)]
+    for start, end in ranges:
+        expected = _brute_totals(plan, start, end)
+        found = {ing: amount for ing, amount in plan._range_totals(start, end).items()
+                 if amount != 0}
+        assert found == expected
+        assert plan.get_shopping_list(start, end) == sorted(
+            [ing.name, total_to_str(amount)] for ing, amount in expected.items())
+
+@pytest.mark.parametrize("places", [None, 6])
+def test_range_totals_match_brute_force(sample_path, places):
+    if places != None:
+        amounts.use_fixed_point(places)
+    cookbook = Cookbook.load(sample_path)
+    plan = cookbook.mealplans[0]
+    components = ["flour", "egg", "milk", "sugar", "batter", "crepes"]
+    rng = random.Random(21)
+    for _ in range(30):
+        plan.new_day()
+        for _ in range(rng.randrange(4)):
+            plan._new_component(plan._days[-1], rng.choice(components),
+                                str(rng.randrange(1, 40) / 4))
+    _check_ranges(plan, rng)
+    for turn in range(60):
+        day = plan._days[rng.randrange(len(plan._days))]
+        if turn % 4 == 0:
+            plan.new_day()
+            plan._new_component(plan._days[-1], rng.choice(components), "3")
+        elif turn % 4 == 1 and day:
+            plan._change_amount(day, rng.randrange(len(day)), str(rng.randrange(1, 9)))
+        elif turn % 4 == 2 and day:
+            with plan.batch():
+                plan._remove_component(day, 0)
+                plan._new_component(day, rng.choice(components), "0.5")
+        elif len(plan._days) > 10:
+            plan.remove_day(rng.randrange(len(plan._days)))
+        _check_ranges(plan, rng)
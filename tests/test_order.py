@@ -0,0 +1,60 @@
+import random
+
+from kytchen.cookbook import Cookbook
+from kytchen.recipe import Recipe
+
+def _uses(recipe):
+    return [used for used, _ in recipe.amounts if isinstance(used, Recipe)]
+
+def _reaches(start, goal):
+    stack = [start]
+    seen = {start}
+    while stack:
+        recipe = stack.pop()
+        if recipe is goal:
+            return True
+        for used in _uses(recipe):
+            if used not in seen:
+                seen.add(used)
+                stack.append(used)
+    return False
+
+def _check_order(cookbook):
+    linked = [recipe for recipe in cookbook.recipes if recipe._order != None]
+    assert len({recipe._order for recipe in linked}) == len(linked)
+    for recipe in cookbook.recipes:
+        for used in _uses(recipe):
+            assert used._order < recipe._order
+    order = cookbook.recipes_in_order()
+    for i, recipe in enumerate(order):
+        assert all(order.index(used) < i for used in _uses(recipe))
+
+def test_links_keep_the_order_and_refuse_cycles():
+    rng = random.Random(10)
+    cookbook = Cookbook()
+    recipes = [Recipe(f"r{i}", cookbook) for i in range(25)]
+    for recipe in recipes:
+        cookbook.register_recipe(recipe)
+    refused = 0
+    for turn in range(400):
+        origin, component = rng.choice(recipes), rng.choice(recipes)
+        if turn % 5 == 4 and origin.amounts:
+            origin.remove_component(rng.randrange(len(origin.amounts)))
+        else:
+            cycle = _reaches(component, origin)
+            assert origin.new_component(component._id, "1") != cycle
+            refused += cycle
+        _check_order(cookbook)
+    assert refused > 0
+
+def test_direct_cycles_are_refused():
+    cookbook = Cookbook()
+    a, b, c = (Recipe(name, cookbook) for name in "abc")
+    for recipe in (a, b, c):
+        cookbook.register_recipe(recipe)
+    assert not a.new_component("a", "1")
+    assert a.new_component("b", "1") and b.new_component("c", "1")
+    assert not c.new_component("a", "1")
+    assert not c.new_component("b", "1")
+    assert len(c.amounts) == 0
+    _check_order(cookbook)
@@ -0,0 +1,40 @@
+import random
+
+from kytchen.recipe import Step, Steps
+
+def _check(steps):
+    seconds = [step.seconds for step in steps]
+    assert [steps.elapsed(i) for i in range(len(steps))] == [
+        sum(seconds[:i + 1]) for i in range(len(seconds))]
+    assert steps.total() == sum(seconds)
+    if steps:
+        assert steps.elapsed(-1) == steps.total()
+
+def test_running_times_follow_every_edit():
+    rng = random.Random(12)
+    steps = Steps(Step(f"step {i}", rng.randrange(600)) for i in range(20))
+    _check(steps)
+    for turn in range(300):
+        op = turn % 6
+        index = rng.randrange(len(steps))
+        if op == 0:
+            steps.append(Step("added", rng.randrange(600)))
+        elif op == 1:
+            steps.insert(index, Step("inserted", rng.randrange(600)))
+        elif op == 2 and len(steps) > 1:
+            del steps[index]
+        elif op == 3:
+            # Moving a step up, as the steps table does.
+            above = max(index - 1, 0)
+            steps[above], steps[index] = steps[index], steps[above]
+        elif op == 4:
+            steps.set_seconds(index, rng.randrange(600))
+        else:
+            steps[index].seconds = rng.randrange(600)
+        _check(steps)
+
+def test_empty_steps():
+    steps = Steps()
+    assert steps.total() == 0
+    steps.append(Step("only", 30))
+    _check(steps)
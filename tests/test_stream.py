@@ -0,0 +1,54 @@
+import io
+import json
+
+import pytest
+
+from kytchen.cookbook import Cookbook
+from kytchen.stream import iter_sections
+
+DATA = {
+    "ingredients": [{"id": "a 1\" pan}, \\ x", "calories": "1e-07", "unit": "é g"}],
+    "recipes": [],
+    "mealplans": [{"name": "x, y", "days": [[], [["a", "-2.5"]]]}],
+    "seq": 12,
+    "flags": {"nested": [1, 2.5, None, True, "]}"]},
+}
+
+def _sections(data):
+    # What iter_sections should yield for data: an entry per array element.
+    for key, value in data.items():
+        if isinstance(value, list):
+            for element in value:
+                yield key, element
+        else:
+            yield key, value
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_sections_match_json(sample_path, chunk_size, indent):
+    with open(sample_path) as f:
+        sample = json.load(f)
+    for data in (DATA, sample):
+        text = json.dumps(data, indent = indent)
+        found = list(iter_sections(io.StringIO(text), chunk_size))
+        assert found == list(_sections(data))
+
+def test_empty_and_cut_short(sample_path):
+    assert list(iter_sections(io.StringIO("{}"), 1)) == []
+    with open(sample_path) as f:
+        text = f.read()
+    for end in (1, len(text) // 2, len(text) - 1):
+        with pytest.raises(ValueError):
+            list(iter_sections(io.StringIO(text[:end]), 3))
+
+def test_stream_load_matches_json_load(sample_path, tmp_path):
+    with open(sample_path) as f:
+        data = json.load(f)
+    expected = Cookbook.from_data(json.loads(json.dumps(data))).export()
+    assert Cookbook.load(sample_path).export() == expected
+    # Recipes may come before the recipes they use.
+    data["recipes"].reverse()
+    path = tmp_path / "reversed.js"
+    path.write_text(json.dumps(data))
+    expected = Cookbook.from_data(json.loads(json.dumps(data))).export()
+    assert Cookbook.load(str(path)).export() == expected